@@ -1,5 +1,7 @@
 """Run Bybit scans at a fixed interval and save each result."""
 
+import atexit
+import heapq
 import time
 from datetime import datetime
 import pandas as pd
@@ -7,62 +9,75 @@ import pandas as pd
 import scan
 import core
 
+# Seconds between refreshes of each metric, in the order they run when due
+# together. The volume export also writes the latest funding and OI frames.
+INTERVALS = {
+    "funding": 60,
+    "oi": 5 * 60,
+    "corr": 15 * 60,
+    "volume": 20 * 60,
+}
+# Seconds before retrying a job that could not run.
+RETRY_SECONDS = 60
 
-def run_periodic_scans() -> None:  # pylint: disable=too-many-branches,too-many-statements
+
+def run_periodic_scans() -> None:  # pylint: disable=too-many-branches,too-many-statements,too-many-locals
     """Refresh each metric at its own interval."""
     logger = scan.setup_logging()
     logger.info("Continuous scan started. Press Ctrl+C to stop.")
+    core.load_kline_history()
+    atexit.register(core.save_kline_history)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"Scan_{timestamp}.xlsx"
 
-    intervals = {
-        "funding": 60,
-        "oi": 5 * 60,
-        "corr": 15 * 60,
-        "volume": 20 * 60,
-    }
-    next_run = {key: 0 for key in intervals}
+    # Min-heap of (deadline, job) so the loop sleeps until the next job is due.
+    schedule = [(0.0, name) for name in INTERVALS]
+    heapq.heapify(schedule)
 
     volume_df = pd.DataFrame()
     funding_df = pd.DataFrame()
     oi_df = pd.DataFrame()
-    corr_df: pd.DataFrame = pd.DataFrame()
     symbol_order: list[str] = []
 
     while True:
+        time.sleep(max(0.0, schedule[0][0] - time.time()))
         now = time.time()
-        try:
-            if (
-                now >= next_run["funding"]
-                or now >= next_run["oi"]
-                or now >= next_run["corr"]
-                or now >= next_run["volume"]
-            ):
-                logger.info("Fetching USDT perpetual futures from Bybit...")
-                all_symbols = core.get_tradeable_symbols_sorted_by_volume()
-                logger.info("Total pairs found: %d", len(all_symbols))
+        due = set()
+        while schedule and schedule[0][0] <= now:
+            due.add(heapq.heappop(schedule)[1])
 
-                if not all_symbols:
-                    logger.warning("No symbols retrieved. Skipping export.")
-                else:
-                    if now >= next_run["funding"]:
+        completed = set()
+        try:
+            logger.info("Fetching USDT perpetual futures from Bybit...")
+            all_symbols = core.get_tradeable_symbols_sorted_by_volume()
+            logger.info("Total pairs found: %d", len(all_symbols))
+
+            if not all_symbols:
+                logger.warning("No symbols retrieved. Skipping export.")
+            else:
+                # Volume and correlation read the same klines, so fetch them
+                # once, concurrently, for whichever of the two is due.
+                klines_cache = (
+                    scan.prefetch_klines(all_symbols, logger)
+                    if due & {"corr", "volume"}
+                    else None
+                )
+                for name in INTERVALS:
+                    if name not in due:
+                        continue
+                    if name == "funding":
                         funding_df = scan.run_funding_rate_scan(all_symbols, logger)
                         symbol_order = [s for s, _ in all_symbols]
-                        next_run["funding"] = now + intervals["funding"]
-
-                    if now >= next_run["oi"]:
+                    elif name == "oi":
                         oi_df = scan.run_open_interest_scan(all_symbols, logger)
-                        next_run["oi"] = now + intervals["oi"]
-
-                    if now >= next_run["corr"]:
-                        matrix_map = scan.run_correlation_matrix_scan(all_symbols, logger)
+                    elif name == "corr":
+                        matrix_map = scan.run_correlation_matrix_scan(
+                            all_symbols, logger, klines_cache
+                        )
                         scan.export_correlation_matrices(matrix_map, logger)
-                        next_run["corr"] = now + intervals["corr"]
-
-                    if now >= next_run["volume"]:
-                        volume_df = scan.run_volume_scan(all_symbols, logger)
-                        next_run["volume"] = now + intervals["volume"]
+                    else:
+                        volume_df = scan.run_volume_scan(all_symbols, logger, klines_cache)
                         scan.export_all_data(
                             volume_df,
                             funding_df,
@@ -71,27 +86,14 @@ def run_periodic_scans() -> None:  # pylint: disable=too-many-branches,too-many-
                             logger,
                             filename=filename,
                         )
-                    if now >= next_run["volume"]:
-                        next_run["volume"] = now + intervals["volume"]
-                    if now >= next_run["funding"]:
-                        next_run["funding"] = now + intervals["funding"]
-                    if now >= next_run["oi"]:
-                        next_run["oi"] = now + intervals["oi"]
-
-            if now >= next_run["corr"]:
-                logger.info("Updating correlation matrix")
-                all_symbols = core.get_tradeable_symbols_sorted_by_volume()
-                corr_df = scan.run_correlation_matrix_scan(all_symbols, logger)
-                scan.export_correlation_matrices(
-                    corr_df, logger
-                )
-                next_run["corr"] = now + intervals["corr"]
-
+                    completed.add(name)
 
         except (RuntimeError, ValueError, TypeError) as exc:
             logger.exception("Script failed: %s", exc)
 
-        time.sleep(60)
+        for name in due:
+            delay = INTERVALS[name] if name in completed else RETRY_SECONDS
+            heapq.heappush(schedule, (now + delay, name))
 
 
 if __name__ == "__main__":
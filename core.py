@@ -2,95 +2,260 @@
 
 import os
 import time
-import json
+import atexit
+import functools
+import heapq
+import queue
 import random
+import threading
 import logging
-import hashlib
+import logging.handlers
+import zipfile
+from collections import deque
+from operator import itemgetter
 from datetime import datetime, timezone
+from typing import Iterable
 
 import asyncio
+import bisect
+import numpy as np
+import orjson
 import requests
-from tqdm import tqdm
+from requests.adapters import HTTPAdapter
 import httpx
 import correlation_math
 import percentile_math
+import volume_math
+
+LOGGER = logging.getLogger("volume_logger")
 
 MAX_DUPLICATE_RETRIES = 3
+# Exponential retry backoff: first delay and ceiling, in seconds.
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Each kline page holds 1000 one-minute bars.
+KLINE_PAGE_MS = 1000 * 60 * 1000
+# Klines are requested up to the start of the current 15 minute window.
+KLINE_WINDOW_MS = 15 * 60 * 1000
+# Quote currency of the perpetuals that are scanned.
+QUOTE_COIN = "USDT"
+# Seconds a fetched tickers snapshot stays fresh.
+SYMBOLS_TTL = 30.0
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
+KLINE_HISTORY_PATH = os.path.join(BASE_DIR, "cache", "kline_history.npz")
+
+# Shared keep-alive session so repeated Bybit calls skip the TCP/TLS handshake.
+SESSION = requests.Session()
+SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+)
+
+# Shared by every concurrent kline and open interest request. Queued requests
+# wait for a free connection rather than failing with a pool timeout.
+ASYNC_CLIENT_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+ASYNC_TIMEOUT = httpx.Timeout(10, pool=None)
+
+_TICKERS_CACHE: dict[str, tuple[float, list]] = {}
+
+# Entries kept per symbol cache below. Bybit lists a few hundred linear
+# contracts, so this only evicts symbols that stopped being scanned.
+SYMBOL_CACHE_SIZE = 1024
+
+# Oldest-first kline history per (symbol, interval). Later fetches only page
+# back to the newest stored bar and splice the new bars on.
+KLINE_HISTORY: dict[tuple[str, str], list] = {}
+
+# Latest fetch per (symbol, interval, total) with the window end it covers.
+# Every scan pass in the same 15 minute window reuses it instead of paging
+# Bybit again, so BTC and each symbol are fetched once per window.
+_RECENT_KLINES: dict[tuple[str, str, int], tuple[int, list]] = {}
+
+# Seconds per open interest interval. A fetched history cannot gain a row
+# until the current period ends, so it is reused until then.
+OPEN_INTEREST_SECONDS = {
+    "5min": 5 * 60,
+    "15min": 15 * 60,
+    "30min": 30 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+_OPEN_INTEREST_CACHE: dict[tuple[str, str, int], tuple[int, list]] = {}
+
+# Kline field positions that are read as float columns.
+KLINE_FIELDS = {"close": 4, "volume": 5}
+
+# Oldest-first NumPy columns per symbol, reused while the kline list is the
+# same object, so the volume and correlation passes (and every symbol's
+# comparison with BTC) parse each list once.
+_KLINE_COLUMNS: dict[str, tuple[list, dict[str, np.ndarray]]] = {}
+
+# Scan worker threads share the caches above, so inserts and evictions
+# are serialised.
+_CACHE_LOCK = threading.Lock()
+
 
+def _cache_put(cache: dict, key, value, maxsize: int = SYMBOL_CACHE_SIZE) -> None:
+    """Store ``value`` as the most recent entry, evicting the least recent."""
+    with _CACHE_LOCK:
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > maxsize:
+            cache.pop(next(iter(cache)), None)
 
+
+@functools.cache
 def get_debug_logger() -> logging.Logger:
     """Return a shared debug logger writing to ``logs/scanlog.txt``."""
-    if not hasattr(get_debug_logger, "cached_logger"):
-        logger = logging.getLogger("debug_logger")
-        logger.setLevel(logging.DEBUG)
-        log_path = os.path.join(LOG_DIR, "scanlog.txt")
-        handler = logging.FileHandler(log_path, mode="a")
-        handler.setFormatter(
-            logging.Formatter("[%(levelname)s] %(asctime)s %(message)s")
-        )
-        logger.addHandler(handler)
-        get_debug_logger.cached_logger = logger
-    return get_debug_logger.cached_logger
+    logger = logging.getLogger("debug_logger")
+    # Per-chunk DEBUG lines are only written when SCAN_DEBUG is set.
+    logger.setLevel(logging.DEBUG if os.environ.get("SCAN_DEBUG") else logging.INFO)
+    log_path = os.path.join(LOG_DIR, "scanlog.txt")
+    handler = logging.FileHandler(log_path, mode="a")
+    handler.setFormatter(
+        logging.Formatter("[%(levelname)s] %(asctime)s %(message)s")
+    )
+    # Fetch threads only enqueue records; a listener thread does the file I/O.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return logger
+
+
+def parse_json(response: requests.Response | httpx.Response) -> dict:
+    """Decode a response body with orjson rather than the stdlib decoder."""
+    return orjson.loads(response.content)  # pylint: disable=no-member
 
 
+@functools.cache
 def get_auth_headers() -> dict:
-    """Return request headers with API key or a generic user agent."""
+    """Return request headers with API key or a generic user agent.
+
+    The environment is read once; the same dict is shared by every request.
+    """
     api_key = os.getenv("BYBIT_API_KEY")
     if api_key:
         return {"X-BYBIT-API-KEY": api_key}
     return {"User-Agent": "VolumeScannerBot/1.0"}
 
 
-def get_tradeable_symbols_sorted_by_volume() -> list:
-    """Return USDT symbols sorted by 24h turnover descending."""
+def get_linear_tickers(ttl: float = SYMBOLS_TTL) -> list:
+    """Return the raw tickers snapshot for all linear contracts.
+
+    The snapshot carries turnover and funding rate for every symbol, so it is
+    reused for ``ttl`` seconds by all callers within a scan cycle.
+    """
+    now = time.monotonic()
+    cached = _TICKERS_CACHE.get("linear")
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+
     url = "https://api.bybit.com/v5/market/tickers?category=linear"
+    response = SESSION.get(url, headers=get_auth_headers(), timeout=10)
+    response.raise_for_status()
+    tickers = parse_json(response).get("result", {}).get("list", [])
+    LOGGER.debug("Fetched %d linear tickers", len(tickers))
+    _TICKERS_CACHE["linear"] = (now, tickers)
+    return tickers
+
+
+def get_tradeable_symbols_sorted_by_volume(
+    ttl: float = SYMBOLS_TTL, top_k: int | None = None
+) -> list:
+    """Return ``QUOTE_COIN`` symbols sorted by 24h turnover descending.
+
+    With ``top_k`` only the ``top_k`` highest-turnover symbols are returned.
+    """
+    quote_len = len(QUOTE_COIN)
     try:
-        with tqdm(total=1, desc="Fetching symbols") as pbar:
-            response = requests.get(url, headers=get_auth_headers(), timeout=10)
-            response.raise_for_status()
-            pbar.update(1)
-        tickers = response.json().get("result", {}).get("list", [])
-        filtered = [
-            (item["symbol"], float(item.get("turnover24h", 0)))
+        tickers = get_linear_tickers(ttl)
+        symbols = [
+            (symbol, float(item.get("turnover24h") or 0))
             for item in tickers
-            if item.get("symbol", "").endswith("USDT")
+            if (symbol := item.get("symbol", ""))[-quote_len:] == QUOTE_COIN
         ]
-        sorted_filtered = sorted(filtered, key=lambda x: x[1], reverse=True)
-        return sorted_filtered
-    except requests.RequestException as err:
-        logging.getLogger("volume_logger").error(
+        if top_k is not None:
+            return heapq.nlargest(top_k, symbols, key=itemgetter(1))
+        symbols.sort(key=itemgetter(1), reverse=True)
+        return symbols
+    except (requests.RequestException, ValueError) as err:
+        LOGGER.error(
             "Failed to fetch and sort symbols by volume: %s", err
         )
         return []
 
 
-def stable_chunk_hash(chunk: list) -> str:
-    """Return a deterministic MD5 hash for a kline chunk."""
-    return hashlib.md5(
-        json.dumps(chunk, sort_keys=True, separators=(",", ":")).encode()
-    ).hexdigest()
+def get_funding_rates(ttl: float = SYMBOLS_TTL) -> dict[str, float]:
+    """Return the latest funding rate for every linear symbol in one request."""
+    try:
+        return {
+            item["symbol"]: float(item.get("fundingRate") or 0)
+            for item in get_linear_tickers(ttl)
+            if "symbol" in item
+        }
+    except (requests.RequestException, ValueError):
+        LOGGER.warning("Failed to fetch funding rates")
+        return {}
+
+
+def stable_chunk_hash(chunk: list) -> tuple:
+    """Return a cheap identity key for a kline chunk.
 
+    Klines are unique per start time, so the first/last timestamps and the
+    length identify a page without serialising or hashing every row.
+    """
+    return (chunk[0][0], chunk[-1][0], len(chunk))
 
-def build_kline_url(symbol: str, interval: str, start: int) -> str:
-    """Construct the kline API URL for a symbol/interval starting time."""
-    return (
-        "https://api.bybit.com/v5/market/kline?category=linear"
-        + f"&symbol={symbol}"
-        + f"&interval={interval}"
-        + f"&start={start}"
-        + "&limit=1000"
-    )
+
+_KLINE_URL = (
+    "https://api.bybit.com/v5/market/kline?category=linear"
+    "&symbol={symbol}&interval={interval}&start={start}&limit=1000"
+).format
+_KLINE_URL_WITH_END = (
+    "https://api.bybit.com/v5/market/kline?category=linear"
+    "&symbol={symbol}&interval={interval}&start={start}&end={end}&limit=1000"
+).format
+
+
+def build_kline_url(
+    symbol: str, interval: str, start: int, end: int | None = None
+) -> str:
+    """Construct the kline API URL for a symbol/interval time window."""
+    if end is None:
+        return _KLINE_URL(symbol=symbol, interval=interval, start=start)
+    return _KLINE_URL_WITH_END(symbol=symbol, interval=interval, start=start, end=end)
 
 
 def get_kline_end_time() -> int:
     """Return the current UTC timestamp rounded down to the nearest 15m."""
-    now = datetime.now(timezone.utc)
-    floored = now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
-    return int(floored.timestamp() * 1000)
+    now_ms = int(time.time() * 1000)
+    return now_ms - now_ms % KLINE_WINDOW_MS
+
+
+def retry_delay(attempt: int, headers=None) -> float:
+    """Return seconds to wait before retrying after failed ``attempt``.
+
+    A rate-limited response's ``Retry-After`` or Bybit's
+    ``X-Bapi-Limit-Reset-Timestamp`` header wins; otherwise the delay doubles
+    per attempt with a little jitter so concurrent symbols spread out.
+    """
+    if headers is not None:
+        try:
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                return min(BACKOFF_CAP, float(retry_after))
+            reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp")
+            if reset_ms:
+                wait = (int(reset_ms) - time.time() * 1000) / 1000
+                return min(BACKOFF_CAP, max(0.0, wait))
+        except (TypeError, ValueError):
+            pass
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) + random.uniform(0, BACKOFF_BASE)
 
 
 def fetch_with_backoff(url: str, symbol: str, logger: logging.Logger) -> list:
@@ -98,9 +263,9 @@ def fetch_with_backoff(url: str, symbol: str, logger: logging.Logger) -> list:
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, headers=get_auth_headers(), timeout=10)
+            response = SESSION.get(url, headers=get_auth_headers(), timeout=10)
             if response.status_code == 429:
-                delay = round(random.uniform(1.0, 2.5), 2)
+                delay = retry_delay(attempt, response.headers)
                 logger.warning(
                     "[%s] Rate limit hit (429). Retrying in %.2fs...",
                     symbol,
@@ -109,15 +274,15 @@ def fetch_with_backoff(url: str, symbol: str, logger: logging.Logger) -> list:
                 time.sleep(delay)
                 continue
             response.raise_for_status()
-            return response.json().get("result", {}).get("list", [])
-        except requests.RequestException as err:
+            return parse_json(response).get("result", {}).get("list", [])
+        except (requests.RequestException, ValueError) as err:
             logger.warning(
                 "[%s] Request error on attempt %d: %s",
                 symbol,
                 attempt + 1,
                 err
             )
-            time.sleep(1)
+            time.sleep(retry_delay(attempt))
     logger.error("[%s] Failed all retries. Giving up.", symbol)
     return []
 
@@ -129,9 +294,9 @@ async def fetch_with_backoff_async(
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = await client.get(url, headers=get_auth_headers(), timeout=10)
+            response = await client.get(url, headers=get_auth_headers(), timeout=ASYNC_TIMEOUT)
             if response.status_code == 429:
-                delay = round(random.uniform(1.0, 2.5), 2)
+                delay = retry_delay(attempt, response.headers)
                 logger.warning(
                     "[%s] Rate limit hit (429). Retrying in %.2fs...",
                     symbol,
@@ -140,81 +305,239 @@ async def fetch_with_backoff_async(
                 await asyncio.sleep(delay)
                 continue
             response.raise_for_status()
-            return response.json().get("result", {}).get("list", [])
-        except httpx.RequestError as err:
+            return parse_json(response).get("result", {}).get("list", [])
+        except (httpx.RequestError, ValueError) as err:
             logger.warning(
                 "[%s] Request error on attempt %d: %s",
                 symbol,
                 attempt + 1,
                 err,
             )
-            await asyncio.sleep(1)
+            await asyncio.sleep(retry_delay(attempt))
     logger.error("[%s] Failed all retries. Giving up.", symbol)
     return []
 
 
-def fetch_recent_klines(  # pylint: disable=too-many-locals
-    symbol: str,
-    interval: str = "1",
-    total: int = 10080,
-    cache: dict | None = None,
+def _history_to_array(klines: list) -> np.ndarray:
+    """Pack every field of ``klines`` into one float row per bar."""
+    return np.array(klines, dtype=np.float64)
+
+
+def _array_to_history(values: np.ndarray) -> list:
+    """Rebuild full-width string kline rows from ``_history_to_array`` output."""
+    columns = [values[:, 0].astype(np.int64), *values[:, 1:].T]
+    return [list(row) for row in zip(*(column.astype(str).tolist() for column in columns))]
+
+
+def load_kline_history(path: str = KLINE_HISTORY_PATH) -> None:
+    """Restore ``KLINE_HISTORY`` saved by a previous run, if any."""
+    try:
+        with np.load(path) as saved:
+            for name in saved.files:
+                symbol, interval = name.rsplit(":", 1)
+                KLINE_HISTORY[(symbol, interval)] = _array_to_history(saved[name])
+    except FileNotFoundError:
+        return
+    except (OSError, EOFError, ValueError, IndexError, zipfile.BadZipFile) as err:
+        LOGGER.warning("Ignoring unreadable kline history %s: %s", path, err)
+
+
+def save_kline_history(path: str = KLINE_HISTORY_PATH) -> None:
+    """Write ``KLINE_HISTORY`` to ``path`` so the next run only fetches new bars.
+
+    Rows are kept as compressed float arrays rather than strings, so each
+    symbol takes a few hundred KB on disk.
+    """
+    tmp_path = path + ".tmp"
+    arrays = {}
+    for (symbol, interval), klines in list(KLINE_HISTORY.items()):
+        try:
+            arrays[f"{symbol}:{interval}"] = _history_to_array(klines)
+        except ValueError:
+            LOGGER.warning("Not saving malformed kline history for %s", symbol)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+    except OSError as err:
+        LOGGER.warning("Failed to save kline history to %s: %s", path, err)
+
+
+def _history_cutoff(symbol: str, interval: str, oldest_time: int) -> int | None:
+    """Return the newest stored bar time if history covers ``oldest_time``."""
+    history = KLINE_HISTORY.get((symbol, interval))
+    if history and int(history[0][0]) <= oldest_time <= int(history[-1][0]):
+        return int(history[-1][0])
+    return None
+
+
+def _open_time(kline: list) -> int:
+    """Return the open time of ``kline`` in milliseconds."""
+    return int(kline[0])
+
+
+def _is_contiguous(klines: list, interval: str) -> bool:
+    """Return ``True`` if ``klines`` has no missing bars for ``interval``."""
+    if not interval.isdigit():
+        return True
+    open_times = np.fromiter((_open_time(k) for k in klines), dtype=np.int64, count=len(klines))
+    return bool((np.diff(open_times) == int(interval) * 60 * 1000).all())
+
+
+def _merge_kline_history(
+    symbol: str, interval: str, total: int, klines: Iterable, cutoff: int | None
 ) -> list:
-    """Return ``total`` klines for ``symbol`` using backoff retry logic."""
+    """Return the newest ``total`` bars oldest-first, merged with stored history.
+
+    Pages are stitched oldest-first, so the sort is a single linear pass and
+    both sides of the splice are found by binary search.
+    """
+    klines = sorted(klines, key=_open_time)
+    if cutoff is not None:
+        history = KLINE_HISTORY[(symbol, interval)]
+        # The newest stored bar may have been incomplete, so refetched bars
+        # from ``cutoff`` onwards replace it.
+        fresh = klines[bisect.bisect_left(klines, cutoff, key=_open_time):]
+        # A failed page leaves the refresh short of the stored bars, and
+        # splicing it on anyway would hide the gap behind stale history.
+        if not fresh or _open_time(fresh[0]) > cutoff or not _is_contiguous(fresh, interval):
+            LOGGER.warning("%s: Kline refresh does not join stored history, skipping.", symbol)
+            return []
+        klines = history[:bisect.bisect_left(history, cutoff, key=_open_time)] + fresh
+    return klines[-total:]
+
+
+def _cached_klines(
+    symbol: str, interval: str, total: int, window_end: int, cache: dict | None
+) -> list | None:
+    """Return klines already fetched for the current window, if any."""
     if cache is not None and symbol in cache:
         return cache[symbol]
+    memo = _RECENT_KLINES.get((symbol, interval, total))
+    if memo is None or memo[0] != window_end:
+        return None
+    if cache is not None:
+        cache[symbol] = memo[1]
+    return memo[1]
 
-    logger = get_debug_logger()
-    main_logger = logging.getLogger("volume_logger")
 
-    seen_chunks = set()
-    consecutive_duplicates = 0
-    all_klines = []
-    end_time = get_kline_end_time()
+def _kline_plan(
+    symbol: str, interval: str, total: int, window_end: int
+) -> tuple[range, int | None]:
+    """Return the page end times still to fetch and the stored history cutoff."""
+    oldest_time = window_end - total * 60 * 1000
+    cutoff = _history_cutoff(symbol, interval, oldest_time)
+    stop_time = oldest_time if cutoff is None else cutoff
+    return range(window_end, stop_time, -KLINE_PAGE_MS), cutoff
 
-    try:
-        while len(all_klines) < total:
-            start_time = end_time - (1000 * 60 * 1000)
-            url = build_kline_url(symbol, interval, start_time)
-            chunk = fetch_with_backoff(url, symbol, logger)
 
-            if not chunk:
+def _page_url(symbol: str, interval: str, page_end: int) -> str:
+    """Return the URL of the kline page ending just before ``page_end``."""
+    # ``end`` is inclusive, so stop one ms short of the newer page.
+    return build_kline_url(symbol, interval, page_end - KLINE_PAGE_MS, page_end - 1)
+
+
+def _collect_kline_pages(
+    symbol: str, total: int, chunks: Iterable[list], logger: logging.Logger
+) -> deque:
+    """Stitch newest-first kline pages together, skipping repeated pages.
+
+    ``chunks`` is consumed lazily and no further page is pulled once
+    ``total`` bars have been gathered.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    seen_chunks: set[tuple] = set()
+    consecutive_duplicates = 0
+    all_klines: deque = deque()
+    for chunk in chunks:
+        if not chunk:
+            if debug:
                 logger.debug("[%s] Empty chunk received. Ending fetch.", symbol)
+            break
+
+        chunk_key = stable_chunk_hash(chunk)
+        if chunk_key in seen_chunks:
+            consecutive_duplicates += 1
+            if debug:
+                logger.debug(
+                    "[%s] Duplicate chunk #%d detected.", symbol, consecutive_duplicates
+                )
+            if consecutive_duplicates >= MAX_DUPLICATE_RETRIES:
+                logger.warning(
+                    "%s: Max duplicate retries hit. Only %d klines gathered, expected %d.",
+                    symbol,
+                    len(all_klines),
+                    total
+                )
                 break
+            continue
 
-            chunk_key = stable_chunk_hash(chunk)
-            if chunk_key in seen_chunks:
-                consecutive_duplicates += 1
-                logger.debug("[%s] Duplicate chunk #%d detected.", symbol, consecutive_duplicates)
-                if consecutive_duplicates >= MAX_DUPLICATE_RETRIES:
-                    logger.warning(
-                        "%s: Max duplicate retries hit. Only %d klines gathered, expected %d.",
-                        symbol,
-                        len(all_klines),
-                        total
-                    )
-                    break
-                end_time = start_time
-                continue
-
-            seen_chunks.add(chunk_key)
-            all_klines = chunk + all_klines
+        seen_chunks.add(chunk_key)
+        # Bybit pages are newest-first and arrive newest page first, so
+        # prepending each row in turn leaves the whole deque oldest-first.
+        all_klines.extendleft(chunk)
+        if debug:
             logger.debug("[%s] Total klines so far: %d", symbol, len(all_klines))
-            end_time = start_time
-            consecutive_duplicates = 0
-    except requests.RequestException as err:
-        logger.error("[%s] Failed to fetch klines: %s", symbol, err)
+        consecutive_duplicates = 0
+        if len(all_klines) >= total:
+            break
+    return all_klines
 
-    if len(all_klines) < 315:
-        main_logger.warning("%s: Only %d klines returned, skipping.", symbol, len(all_klines))
+
+def _store_klines(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    symbol: str,
+    interval: str,
+    total: int,
+    window_end: int,
+    klines: Iterable,
+    cutoff: int | None,
+    cache: dict | None,
+) -> list:
+    """Merge fetched ``klines`` into the stored history and cache the result."""
+    result = _merge_kline_history(symbol, interval, total, klines, cutoff)
+    if len(result) < 315:
+        LOGGER.warning("%s: Only %d klines returned, skipping.", symbol, len(result))
         return []
 
-    result = all_klines[-total:]
+    # Only a complete, gap-free window is safe to extend on the next run.
+    if len(result) == total and _is_contiguous(result, interval):
+        _cache_put(KLINE_HISTORY, (symbol, interval), result)
+    _cache_put(_RECENT_KLINES, (symbol, interval, total), (window_end, result))
     if cache is not None:
         cache[symbol] = result
     return result
 
 
-async def fetch_recent_klines_async(  # pylint: disable=too-many-locals
+def fetch_recent_klines(
+    symbol: str,
+    interval: str = "1",
+    total: int = 10080,
+    cache: dict | None = None,
+) -> list:
+    """Return ``total`` klines for ``symbol`` using backoff retry logic."""
+    window_end = get_kline_end_time()
+    cached = _cached_klines(symbol, interval, total, window_end, cache)
+    if cached is not None:
+        return cached
+
+    logger = get_debug_logger()
+    page_ends, cutoff = _kline_plan(symbol, interval, total, window_end)
+    # Pages are requested one at a time as the collector pulls them.
+    chunks = (
+        fetch_with_backoff(_page_url(symbol, interval, page_end), symbol, logger)
+        for page_end in page_ends
+    )
+    try:
+        all_klines = _collect_kline_pages(symbol, total, chunks, logger)
+    except requests.RequestException as err:
+        logger.error("[%s] Failed to fetch klines: %s", symbol, err)
+        all_klines = deque()
+
+    return _store_klines(symbol, interval, total, window_end, all_klines, cutoff, cache)
+
+
+async def fetch_recent_klines_async(
     symbol: str,
     interval: str = "1",
     total: int = 10080,
@@ -223,65 +546,36 @@ async def fetch_recent_klines_async(  # pylint: disable=too-many-locals
     client: httpx.AsyncClient | None = None,
 ) -> list:
     """Asynchronously fetch ``total`` klines for ``symbol``."""
-    if cache is not None and symbol in cache:
-        return cache[symbol]
+    window_end = get_kline_end_time()
+    cached = _cached_klines(symbol, interval, total, window_end, cache)
+    if cached is not None:
+        return cached
 
     manage_client = client is None
     if manage_client:
-        client = httpx.AsyncClient()
+        client = httpx.AsyncClient(limits=ASYNC_CLIENT_LIMITS)
 
     logger = get_debug_logger()
-    main_logger = logging.getLogger("volume_logger")
-
-    seen_chunks: set[str] = set()
-    consecutive_duplicates = 0
-    all_klines: list = []
-    end_time = get_kline_end_time()
-
+    page_ends, cutoff = _kline_plan(symbol, interval, total, window_end)
+    all_klines: deque = deque()
     try:
-        while len(all_klines) < total:
-            start_time = end_time - (1000 * 60 * 1000)
-            url = build_kline_url(symbol, interval, start_time)
-            chunk = await fetch_with_backoff_async(url, symbol, logger, client)
-
-            if not chunk:
-                logger.debug("[%s] Empty chunk received. Ending fetch.", symbol)
-                break
-
-            chunk_key = stable_chunk_hash(chunk)
-            if chunk_key in seen_chunks:
-                consecutive_duplicates += 1
-                logger.debug("[%s] Duplicate chunk #%d detected.", symbol, consecutive_duplicates)
-                if consecutive_duplicates >= MAX_DUPLICATE_RETRIES:
-                    logger.warning(
-                        "%s: Max duplicate retries hit. Only %d klines gathered, expected %d.",
-                        symbol,
-                        len(all_klines),
-                        total,
-                    )
-                    break
-                end_time = start_time
-                continue
-
-            seen_chunks.add(chunk_key)
-            all_klines = chunk + all_klines
-            logger.debug("[%s] Total klines so far: %d", symbol, len(all_klines))
-            end_time = start_time
-            consecutive_duplicates = 0
+        # The page windows are known up front, so request them all at once.
+        chunks = await asyncio.gather(
+            *(
+                fetch_with_backoff_async(
+                    _page_url(symbol, interval, page_end), symbol, logger, client
+                )
+                for page_end in page_ends
+            )
+        )
+        all_klines = _collect_kline_pages(symbol, total, chunks, logger)
     except httpx.RequestError as err:
         logger.error("[%s] Failed to fetch klines: %s", symbol, err)
     finally:
         if manage_client:
             await client.aclose()
 
-    if len(all_klines) < 315:
-        main_logger.warning("%s: Only %d klines returned, skipping.", symbol, len(all_klines))
-        return []
-
-    result = all_klines[-total:]
-    if cache is not None:
-        cache[symbol] = result
-    return result
+    return _store_klines(symbol, interval, total, window_end, all_klines, cutoff, cache)
 
 
 async def fetch_all_recent_klines_async(
@@ -291,7 +585,7 @@ async def fetch_all_recent_klines_async(
 ) -> dict[str, list]:
     """Fetch klines for all ``symbols`` concurrently and return a cache."""
     cache: dict[str, list] = {}
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(limits=ASYNC_CLIENT_LIMITS) as client:
         tasks = {
             symbol: fetch_recent_klines_async(
                 symbol, interval, total, cache, client=client
@@ -310,38 +604,108 @@ def get_funding_rate(symbol: str) -> tuple[float, int]:
     )
     fetch_time = int(datetime.now(timezone.utc).timestamp() * 1000)
     try:
-        response = requests.get(url, headers=get_auth_headers(), timeout=10)
+        response = SESSION.get(url, headers=get_auth_headers(), timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = parse_json(response)
         item = data.get("result", {}).get("list", [])[0]
         rate = float(item.get("fundingRate", 0))
         ts = int(data.get("time", fetch_time))
         return rate, ts
     except (IndexError, ValueError, KeyError, requests.RequestException):
-        logging.getLogger("volume_logger").warning(
+        LOGGER.warning(
             "Failed to fetch funding rate for %s", symbol
         )
         return 0.0, 0
 
 
+def _oldest_first(rows: list) -> list:
+    """Return open interest ``rows`` ordered oldest-first.
+
+    Bybit lists rows newest-first, so a reversal usually suffices and the
+    full sort only runs for mixed input.
+    """
+    timestamps = np.array([r.get("timestamp", 0) for r in rows], dtype=np.int64)
+    steps = np.diff(timestamps)
+    if (steps >= 0).all():
+        return rows
+    if (steps <= 0).all():
+        return rows[::-1]
+    return [rows[i] for i in np.argsort(timestamps, kind="stable")]
+
+
+def _open_interest_bucket(interval: str) -> int | None:
+    """Return the index of the current ``interval`` period, if it is known."""
+    seconds = OPEN_INTEREST_SECONDS.get(interval)
+    return None if seconds is None else int(time.time()) // seconds
+
+
+def _cached_open_interest(symbol: str, interval: str, limit: int) -> list | None:
+    """Return rows fetched earlier in the current ``interval`` period, if any."""
+    entry = _OPEN_INTEREST_CACHE.get((symbol, interval, limit))
+    if entry is not None and entry[0] == _open_interest_bucket(interval):
+        return entry[1]
+    return None
+
+
+def _store_open_interest(symbol: str, interval: str, limit: int, rows: list) -> list:
+    """Remember ``rows`` until the next ``interval`` row can appear."""
+    bucket = _open_interest_bucket(interval)
+    if rows and bucket is not None:
+        _cache_put(
+            _OPEN_INTEREST_CACHE,
+            (symbol, interval, limit),
+            (bucket, rows),
+            SYMBOL_CACHE_SIZE * len(OPEN_INTEREST_SECONDS),
+        )
+    return rows
+
+
 def get_open_interest_history(symbol: str, interval: str, limit: int = 200) -> list:
     """Return raw open interest rows for ``symbol``."""
     url = (
         "https://api.bybit.com/v5/market/open-interest"
         f"?category=linear&symbol={symbol}&intervalTime={interval}&limit={limit}"
     )
+    cached = _cached_open_interest(symbol, interval, limit)
+    if cached is not None:
+        return cached
     try:
-        response = requests.get(url, headers=get_auth_headers(), timeout=10)
+        response = SESSION.get(url, headers=get_auth_headers(), timeout=10)
         response.raise_for_status()
-        rows = response.json().get("result", {}).get("list", [])
-        return sorted(rows, key=lambda r: int(r.get("timestamp", 0)))
-    except requests.RequestException:
-        logging.getLogger("volume_logger").warning(
+        rows = parse_json(response).get("result", {}).get("list", [])
+        return _store_open_interest(symbol, interval, limit, _oldest_first(rows))
+    except (requests.RequestException, ValueError):
+        LOGGER.warning(
             "Failed to fetch open interest history for %s", symbol
         )
         return []
 
 
+async def get_open_interest_history_async(
+    symbol: str, interval: str, limit: int = 200, *, client: httpx.AsyncClient
+) -> list:
+    """Asynchronously return raw open interest rows for ``symbol``."""
+    url = (
+        "https://api.bybit.com/v5/market/open-interest"
+        f"?category=linear&symbol={symbol}&intervalTime={interval}&limit={limit}"
+    )
+    cached = _cached_open_interest(symbol, interval, limit)
+    if cached is not None:
+        return cached
+    try:
+        # Share the kline path's retry loop so a 429 backs off instead of
+        # reporting the symbol as unchanged.
+        rows = await fetch_with_backoff_async(url, symbol, LOGGER, client)
+    except httpx.HTTPError:
+        rows = []
+    if not rows:
+        LOGGER.warning(
+            "Failed to fetch open interest history for %s", symbol
+        )
+        return []
+    return _store_open_interest(symbol, interval, limit, _oldest_first(rows))
+
+
 def get_open_interest_change(symbol: str, interval: str = "1h", limit: int = 24) -> float:
     """Return the open interest percentage change for ``symbol``."""
     rows_sorted = get_open_interest_history(symbol, interval, limit)
@@ -354,11 +718,31 @@ def get_open_interest_change(symbol: str, interval: str = "1h", limit: int = 24)
             return 0.0
         return (last - first) / first * 100
     except (ValueError, KeyError, TypeError):
-        logging.getLogger("volume_logger").warning(
+        LOGGER.warning(
             "Failed to fetch open interest change for %s", symbol
         )
         return 0.0
 
+def kline_column(symbol: str, klines: list, field: str) -> np.ndarray:
+    """Return the ``field`` column of ``klines`` as an oldest-first float array."""
+    entry = _KLINE_COLUMNS.get(symbol)
+    if entry is None or entry[0] is not klines:
+        timestamps = np.array([k[0] for k in klines], dtype=np.int64)
+        # Fetched klines are stored oldest-first, so usually no reorder is needed.
+        order = None
+        if (np.diff(timestamps) < 0).any():
+            order = np.argsort(timestamps, kind="stable")
+        entry = (klines, {"order": order})
+        _cache_put(_KLINE_COLUMNS, symbol, entry)
+    columns = entry[1]
+    if field not in columns:
+        index = KLINE_FIELDS[field]
+        values = np.array([k[index] for k in klines], dtype=np.float64)
+        order = columns["order"]
+        columns[field] = values if order is None else values[order]
+    return columns[field]
+
+
 def process_symbol(
     symbol: str,
     logger: logging.Logger,
@@ -369,42 +753,26 @@ def process_symbol(
     if not klines:
         logger.warning("%s skipped: No valid klines returned.", symbol)
         return None
-    sorted_klines = sorted(klines, key=lambda k: int(k[0]))
-
-    def gather_changes(size: int) -> list[float]:
-        blocks = [
-            sorted_klines[i:i + size]
-            for i in range(0, len(sorted_klines) - (size - 1), size)
-            if len(sorted_klines[i:i + size]) == size
-        ]
-        values: list[float] = []
-        for i in range(20, len(blocks)):
-            latest = blocks[i]
-            previous = blocks[i - 20:i]
-            sum_latest = sum(float(k[5]) for k in latest)
-            avg_previous = sum(
-                sum(float(k[5]) for k in blk) for blk in previous
-            ) / len(previous)
-            if avg_previous == 0:
-                values.append(0.0)
-            else:
-                values.append((sum_latest - avg_previous) / avg_previous * 100)
-        return values
+    volumes = kline_column(symbol, klines, "volume")
+    # Every interval is a multiple of 5 minutes, so the longer block sums are
+    # built from the 5M sums instead of re-reducing the raw volumes.
+    five_minute_sums = volume_math.block_sums(volumes, 5)
 
     result = {"Symbol": symbol}
     for size, label in [(5, "5M"), (15, "15M"), (30, "30M"), (60, "1H"), (240, "4H")]:
-        changes = gather_changes(size)
-        latest = changes[-1] if changes else 0.0
-        percentile = (
-            percentile_math.percentile_rank(changes[:-1], latest)
-            if len(changes) > 1
-            else 0.0
-        )
+        sums = volume_math.block_sums(five_minute_sums, size // 5)
+        changes = volume_math.block_changes(sums)
+        latest = float(changes[-1]) if len(changes) else 0.0
+        percentile = percentile_math.latest_percentile(changes)
         result[label] = round(latest, 4)
         result[f"{label} Percentile"] = round(percentile, 4)
 
     return result
 
+# Correlation windows in minutes, keyed by their column label.
+CORRELATION_WINDOWS = {"5M": 5, "15M": 15, "30M": 30, "1H": 60, "4H": 240}
+
+
 def process_symbol_correlation(
     symbol: str,
     btc_klines: list,
@@ -416,14 +784,61 @@ def process_symbol_correlation(
     if not klines or not btc_klines:
         logger.warning("%s skipped: No valid klines returned for correlation.", symbol)
         return None
-    return {
-        "Symbol": symbol,
-        "5M": round(correlation_math.calculate_price_correlation(klines, btc_klines, 5), 4),
-        "15M": round(correlation_math.calculate_price_correlation(klines, btc_klines, 15), 4),
-        "30M": round(correlation_math.calculate_price_correlation(klines, btc_klines, 30), 4),
-        "1H": round(correlation_math.calculate_price_correlation(klines, btc_klines, 60), 4),
-        "4H": round(correlation_math.calculate_price_correlation(klines, btc_klines, 240), 4),
-    }
+    result = {"Symbol": symbol}
+    try:
+        closes = kline_column(symbol, klines, "close")
+        btc_closes = kline_column("BTCUSDT", btc_klines, "close")
+    except (IndexError, ValueError, TypeError):
+        closes = btc_closes = np.empty(0)
+    correlations = correlation_math.closes_correlations(
+        closes, btc_closes, list(CORRELATION_WINDOWS.values())
+    )
+    for label, correlation in zip(CORRELATION_WINDOWS, correlations):
+        result[label] = round(correlation, 4)
+    return result
+
+
+def symbol_closes(
+    symbol: str,
+    logger: logging.Logger,
+    klines_cache: dict | None = None,
+) -> dict:
+    """Return ``symbol`` with its oldest-first closes for ``correlation_rows``."""
+    klines = fetch_recent_klines(symbol, cache=klines_cache)
+    if not klines:
+        logger.warning("%s skipped: No valid klines returned for correlation.", symbol)
+        return None
+    try:
+        closes = kline_column(symbol, klines, "close")
+    except (IndexError, ValueError, TypeError):
+        closes = np.empty(0)
+    return {"Symbol": symbol, "closes": closes}
+
+
+def correlation_rows(closes_rows: list[dict], btc_klines: list) -> list[dict]:
+    """Return correlation metrics vs BTCUSDT for every ``symbol_closes`` row.
+
+    All symbols are correlated together, one matrix product per window.
+    """
+    try:
+        btc_closes = kline_column("BTCUSDT", btc_klines, "close")
+    except (IndexError, ValueError, TypeError):
+        btc_closes = np.empty(0)
+    matrix = correlation_math.closes_correlation_matrix(
+        [row["closes"] for row in closes_rows],
+        btc_closes,
+        list(CORRELATION_WINDOWS.values()),
+    )
+    return [
+        {
+            "Symbol": row["Symbol"],
+            **{
+                label: round(float(correlation), 4)
+                for label, correlation in zip(CORRELATION_WINDOWS, correlations)
+            },
+        }
+        for row, correlations in zip(closes_rows, matrix)
+    ]
 
 
 OPEN_INTEREST_INTERVALS = {
@@ -461,23 +876,71 @@ def _gather_open_interest_changes(rows: list, window: int) -> list[float]:
     return changes
 
 
-def process_symbol_open_interest(symbol: str, _logger: logging.Logger) -> dict:
+def _open_interest_fetch_intervals() -> list[str]:
+    """Return each distinct API interval in ``OPEN_INTEREST_INTERVALS`` once."""
+    # 1D, 1W and 1M share the daily history so fetch each interval once.
+    return list(dict.fromkeys(iv for iv, _ in OPEN_INTEREST_INTERVALS.values()))
+
+
+async def fetch_all_open_interest_async(symbols: list[str]) -> dict[str, dict[str, list]]:
+    """Fetch open interest history for all ``symbols`` concurrently."""
+    intervals = _open_interest_fetch_intervals()
+    async with httpx.AsyncClient(limits=ASYNC_CLIENT_LIMITS) as client:
+        histories = await asyncio.gather(
+            *(
+                get_open_interest_history_async(symbol, interval, 200, client=client)
+                for symbol in symbols
+                for interval in intervals
+            )
+        )
+    count = len(intervals)
+    return {
+        symbol: dict(zip(intervals, histories[i * count:(i + 1) * count]))
+        for i, symbol in enumerate(symbols)
+    }
+
+
+def process_symbol_open_interest(
+    symbol: str,
+    _logger: logging.Logger,
+    oi_cache: dict | None = None,
+) -> dict:
     """Return open interest change metrics with percentiles for ``symbol``."""
+    histories = oi_cache.get(symbol) if oi_cache is not None else None
+    if histories is None:
+        # This runs on the symbol-level scan pool, so the intervals are
+        # fetched in turn rather than on a nested pool per symbol.
+        histories = {
+            interval: get_open_interest_history(symbol, interval, 200)
+            for interval in _open_interest_fetch_intervals()
+        }
+
     result = {"Symbol": symbol}
     for name, (interval, window) in OPEN_INTEREST_INTERVALS.items():
-        rows = get_open_interest_history(symbol, interval, 200)
-        changes = _gather_open_interest_changes(rows, window)
-        latest = changes[-1] if changes else 0.0
-        percentile = (
-            percentile_math.percentile_rank(changes[:-1], latest)
-            if len(changes) > 1
-            else 0.0
-        )
+        changes = np.array(_gather_open_interest_changes(histories[interval], window))
+        latest = float(changes[-1]) if len(changes) else 0.0
+        percentile = percentile_math.latest_percentile(changes)
         result[name] = round(latest, 4)
         result[f"{name} Percentile"] = round(percentile, 4)
     return result
 
 
+def process_symbol_all(
+    symbol: str,
+    logger: logging.Logger,
+    klines_cache: dict | None = None,
+    oi_cache: dict | None = None,
+) -> dict:
+    """Return the volume and open interest rows for ``symbol`` in one call.
+
+    The volume row is ``None`` when no klines were available.
+    """
+    return {
+        "volume": process_symbol(symbol, logger, klines_cache),
+        "open_interest": process_symbol_open_interest(symbol, logger, oi_cache),
+    }
+
+
 def process_symbol_funding(symbol: str, _logger: logging.Logger) -> dict:
     """Return the latest funding rate for ``symbol``."""
     rate, _ = get_funding_rate(symbol)
@@ -2,9 +2,95 @@
 
 from __future__ import annotations
 
-import pandas as pd
+import numpy as np
 
 
+def _returns_correlation(s_ret: np.ndarray, b_ret: np.ndarray) -> float:
+    """Return the Pearson correlation of two equal-length return series."""
+    if (s_ret == s_ret[0]).all() or (b_ret == b_ret[0]).all():
+        return 0.0
+
+    s_dev = s_ret - s_ret.mean()
+    b_dev = b_ret - b_ret.mean()
+    correlation = (s_dev @ b_dev) / np.sqrt((s_dev @ s_dev) * (b_dev @ b_dev))
+    return float(np.clip(correlation, -1.0, 1.0))
+
+
+def closes_correlations(
+    symbol_closes: np.ndarray,
+    btc_closes: np.ndarray,
+    windows: list[int],
+) -> list[float]:
+    """Return return correlations over each of ``windows`` minutes.
+
+    Minute returns are computed once for the longest window and every
+    shorter window reads its tail.
+    """
+    longest = max(windows)
+    span = min(len(symbol_closes), len(btc_closes), longest + 1)
+    s_closes = symbol_closes[-span:]
+    b_closes = btc_closes[-span:]
+    s_ret = np.diff(s_closes) / s_closes[:-1]
+    b_ret = np.diff(b_closes) / b_closes[:-1]
+    return [
+        _returns_correlation(s_ret[-minutes:], b_ret[-minutes:])
+        if minutes < span
+        else 0.0
+        for minutes in windows
+    ]
+
+
+def _rows_correlation(s_rets: np.ndarray, b_ret: np.ndarray) -> np.ndarray:
+    """Return the Pearson correlation of each row of ``s_rets`` with ``b_ret``."""
+    if (b_ret == b_ret[0]).all():
+        return np.zeros(len(s_rets))
+
+    s_dev = s_rets - s_rets.mean(axis=1, keepdims=True)
+    b_dev = b_ret - b_ret.mean()
+    denom = np.sqrt(np.einsum("ij,ij->i", s_dev, s_dev) * (b_dev @ b_dev))
+    flat = (s_rets == s_rets[:, :1]).all(axis=1)
+    correlation = np.divide(
+        s_dev @ b_dev, denom, out=np.zeros(len(s_rets)), where=~flat
+    )
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def closes_correlation_matrix(
+    closes: list[np.ndarray],
+    btc_closes: np.ndarray,
+    windows: list[int],
+) -> np.ndarray:
+    """Return an ``(len(closes), len(windows))`` array of correlations to BTC.
+
+    Symbols with enough history are stacked into one matrix so each window
+    is a single matrix-vector product; shorter ones use ``closes_correlations``.
+    """
+    result = np.zeros((len(closes), len(windows)))
+    span = min(len(btc_closes), max(windows) + 1)
+    full = [i for i, c in enumerate(closes) if len(c) >= span > 1]
+    for i in set(range(len(closes))).difference(full):
+        result[i] = closes_correlations(closes[i], btc_closes, windows)
+    if not full:
+        return result
+
+    s_closes = np.stack([closes[i][-span:] for i in full])
+    b_closes = btc_closes[-span:]
+    s_ret = np.diff(s_closes, axis=1) / s_closes[:, :-1]
+    b_ret = np.diff(b_closes) / b_closes[:-1]
+    for col, minutes in enumerate(windows):
+        if minutes < span:
+            result[full, col] = _rows_correlation(s_ret[:, -minutes:], b_ret[-minutes:])
+    return result
+
+
+def closes_correlation(
+    symbol_closes: np.ndarray,
+    btc_closes: np.ndarray,
+    minutes: int,
+) -> float:
+    """Return the Pearson correlation of minute returns from oldest-first closes."""
+    return closes_correlations(symbol_closes, btc_closes, [minutes])[0]
+
 
 def calculate_price_correlation(
     symbol_klines: list,
@@ -15,26 +101,11 @@ def calculate_price_correlation(
     try:
         s_sorted = sorted(symbol_klines, key=lambda k: int(k[0]))
         b_sorted = sorted(btc_klines, key=lambda k: int(k[0]))
-
-        if len(s_sorted) < minutes + 1 or len(b_sorted) < minutes + 1:
-            return 0.0
-
-        s_closes = [float(k[4]) for k in s_sorted[-(minutes + 1):]]
-        b_closes = [float(k[4]) for k in b_sorted[-(minutes + 1):]]
-
-        s_ret = [
-            (s_closes[i + 1] - s_closes[i]) / s_closes[i]
-            for i in range(minutes)
-        ]
-        b_ret = [
-            (b_closes[i + 1] - b_closes[i]) / b_closes[i]
-            for i in range(minutes)
-        ]
-
-        if len(set(s_ret)) <= 1 or len(set(b_ret)) <= 1:
-            return 0.0
-
-        return float(pd.Series(s_ret).corr(pd.Series(b_ret)))
+        return closes_correlation(
+            np.array([k[4] for k in s_sorted], dtype=np.float64),
+            np.array([k[4] for k in b_sorted], dtype=np.float64),
+            minutes,
+        )
     except (IndexError, ValueError, TypeError):
         return 0.0
 
@@ -1,28 +1,27 @@
 import argparse
+import mmap
 import os
 import re
 from collections import defaultdict
 
 
+# One pattern per line: the first ``[word]`` on the line names its symbol.
+LINE_RE = re.compile(rb"^(?:[^\n]*?\[(\w+)\])?[^\n]*$", re.MULTILINE)
+
+
 def group_log_by_symbol(logfile: str, output: str | None = None) -> str:
     """Group debug log lines by symbol and write to output file."""
-    symbol_re = re.compile(r"\[(\w+)\]")
     groups: defaultdict[str, list[str]] = defaultdict(list)
 
-    with open(logfile, "r", encoding="utf-8") as f:
-        for line in f:
-            match = symbol_re.search(line)
-            if match:
+    if os.path.getsize(logfile):
+        with open(logfile, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            for match in LINE_RE.finditer(mm):
+                if match.start() == size:
+                    break
                 symbol = match.group(1)
-                # skip timestamp group - the first [ ] is timestamp
-                if re.match(r"\d{4}-\d{2}-\d{2}", symbol):
-                    # timestamp captured; look for next symbol
-                    rest = line[match.end():]
-                    m2 = symbol_re.search(rest)
-                    symbol = m2.group(1) if m2 else "UNKNOWN"
-            else:
-                symbol = "UNKNOWN"
-            groups[symbol].append(line.rstrip())
+                symbol = symbol.decode("utf-8") if symbol else "UNKNOWN"
+                groups[symbol].append(match.group(0).decode("utf-8").rstrip())
 
     if output is None:
         base, ext = os.path.splitext(logfile)
@@ -30,10 +29,7 @@ def group_log_by_symbol(logfile: str, output: str | None = None) -> str:
 
     with open(output, "w", encoding="utf-8") as f:
         for symbol in sorted(groups):
-            f.write(f"### {symbol} ###\n")
-            for row in groups[symbol]:
-                f.write(row + "\n")
-            f.write("\n")
+            f.write(f"### {symbol} ###\n" + "\n".join(groups[symbol]) + "\n\n")
 
     return output
 
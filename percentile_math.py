@@ -2,7 +2,17 @@
 
 from __future__ import annotations
 
-import pandas as pd
+import numpy as np
+
+
+def _rank_in_sorted(ordered: np.ndarray, current: float) -> float:
+    """Return the percentile rank of ``current``, which must be in ``ordered``.
+
+    Tied values share their average rank, as with ``pd.Series.rank(pct=True)``.
+    """
+    below = np.searchsorted(ordered, current, side="left")
+    through = np.searchsorted(ordered, current, side="right")
+    return float((below + 1 + through) / 2 / len(ordered))
 
 
 def percentile_rank(values: list[float], current: float) -> float:
@@ -10,7 +20,18 @@ def percentile_rank(values: list[float], current: float) -> float:
     try:
         if not values:
             return 0.0
-        series = pd.Series(values + [current])
-        return float(series.rank(pct=True).iloc[-1])
+        ordered = np.sort(np.append(np.asarray(values, dtype=np.float64), current))
+        return _rank_in_sorted(ordered, current)
     except (ValueError, TypeError):
         return 0.0
+
+
+def latest_percentile(changes: np.ndarray) -> float:
+    """Return the percentile rank of the last of ``changes`` among all of them.
+
+    Equivalent to ``percentile_rank(changes[:-1], changes[-1])`` without
+    splitting the series first.
+    """
+    if len(changes) < 2:
+        return 0.0
+    return _rank_in_sorted(np.sort(changes), changes[-1])
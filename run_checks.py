@@ -2,6 +2,7 @@
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from contextlib import redirect_stdout
 
@@ -30,18 +31,25 @@ def run_pylint() -> None:
     os.makedirs(LOG_DIR, exist_ok=True)
     log_path = os.path.join(LOG_DIR, "pylint.log")
 
-    with open(log_path, "w", encoding="utf-8") as log_file:
+    # Each file gets its own pylint process; the threads only wait on them.
+    # Results are still written in PY_FILES order.
+    with open(log_path, "w", encoding="utf-8") as log_file, \
+         ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [
+            executor.submit(
+                subprocess.run, ["pylint", path], text=True, capture_output=True
+            )
+            for path in PY_FILES
+        ]
         with tqdm(total=len(PY_FILES), desc="pylint") as pbar:
-            for path in PY_FILES:
-                result = subprocess.run([
-                    "pylint",
-                    path,
-                ], text=True, capture_output=True)
+            for path, future in zip(PY_FILES, futures):
+                result = future.result()
                 sys.stdout.write(result.stdout)
                 log_file.write(result.stdout)
                 sys.stdout.flush()
                 log_file.flush()
                 if result.returncode != 0:
+                    executor.shutdown(cancel_futures=True)
                     raise SystemExit(f"pylint failed for {path}")
                 pbar.update(1)
 
@@ -1,8 +1,13 @@
 """Utilities for running a Bybit volume scan and exporting results."""
 
 import os
+import atexit
+import functools
+from itertools import islice
 import logging
+import logging.handlers
 import platform
+import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
 import webbrowser
@@ -15,24 +20,46 @@ from tqdm import tqdm
 from xlsxwriter.utility import xl_col_to_name
 
 import core
-from scan_utils import wait_for_file_close
+from scan_utils import replace_file, temp_path, wait_for_file_close
 
-def setup_logging() -> logging.Logger:
-    """Configure and return the main scanner logger."""
+def setup_logging(buffered: bool = False) -> logging.Logger:
+    """Configure and return the main scanner logger.
+
+    With ``buffered`` the log file receives INFO lines in batches, which
+    suits a one-shot scan; long-running callers keep the default so lines
+    are written as they happen.
+    """
     logger = logging.getLogger("volume_logger")
     logger.setLevel(logging.INFO)
 
     if not logger.handlers:
+        os.makedirs("logs", exist_ok=True)
         fh = logging.FileHandler("logs/scanlog.txt")
         fh.setLevel(logging.INFO)
         formatter = logging.Formatter("%(asctime)s - %(message)s")
         fh.setFormatter(formatter)
-        logger.addHandler(fh)
+        file_handler: logging.Handler = fh
+        if buffered:
+            # INFO lines reach the file in batches; a warning flushes at once.
+            file_handler = logging.handlers.MemoryHandler(
+                1024, flushLevel=logging.WARNING, target=fh
+            )
+            file_handler.setLevel(logging.INFO)
 
         sh = logging.StreamHandler()
         sh.setLevel(logging.INFO)
         sh.setFormatter(formatter)
-        logger.addHandler(sh)
+
+        # Scan threads only enqueue records; a listener thread writes them out.
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, sh, respect_handler_level=True
+        )
+        listener.start()
+        # Exit handlers run last-registered first: drain the queue, then flush.
+        atexit.register(file_handler.close)
+        atexit.register(listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     return logger
 
@@ -41,13 +68,59 @@ def clean_existing_excels(logger: logging.Logger | None = None) -> None:
     """Delete existing Excel files in the working directory."""
     if logger is None:
         logger = logging.getLogger("volume_logger")
-    for file in os.listdir():
-        if file.endswith(".xlsx"):
-            wait_for_file_close(file, logger)
-            try:
-                os.remove(file)
-            except OSError:
-                logger.warning("Failed to delete %s", file)
+    with os.scandir(".") as entries:
+        for entry in entries:
+            file = entry.name
+            if file.endswith(".xlsx") and entry.is_file(follow_symlinks=False):
+                try:
+                    os.remove(file)
+                except PermissionError:
+                    # Still open in another program: wait for it, then retry.
+                    wait_for_file_close(file, logger)
+                    try:
+                        os.remove(file)
+                    except OSError:
+                        logger.warning("Failed to delete %s", file)
+                except OSError:
+                    logger.warning("Failed to delete %s", file)
+
+def sort_by_symbol_order(
+    df: pd.DataFrame,
+    symbol_order: list,
+    logger: logging.Logger,
+    target: str,
+) -> pd.DataFrame:
+    """Return ``df`` with rows ordered like ``symbol_order``.
+
+    Shared by the Excel and HTML exporters. The caller's frame is left
+    untouched.
+    """
+    if "Symbol" not in df.columns:
+        logger.warning("'Symbol' column missing. Skipping sorting for %s", target)
+        return df
+    if df.empty:
+        return df
+    # Position of each symbol in ``symbol_order``; unknown symbols go last.
+    positions = pd.Index(symbol_order).drop_duplicates().get_indexer(df["Symbol"])
+    positions[positions < 0] = len(symbol_order)
+    return df.iloc[positions.argsort(kind="stable")]
+
+
+# Rows are written strictly in order, so xlsxwriter can flush each one to
+# disk instead of keeping the whole sheet in memory. Ratios over an empty
+# block can be infinite, which xlsxwriter rejects unless written as errors.
+EXCEL_ENGINE_KWARGS = {"options": {"constant_memory": True, "nan_inf_to_errors": True}}
+
+# Cell format properties, registered with each workbook as it is written.
+EXCEL_FORMATS = {
+    "header": {"bold": True},
+    "red": {"bg_color": "#FFC7CE", "font_color": "#9C0006"},
+    "green": {"bg_color": "#C6EFCE", "font_color": "#006100"},
+    "currency": {"num_format": "$#,##0.00"},
+    "percent": {"num_format": '0.00"%"'},
+    "funding": {"num_format": "0.0000000%"},
+}
+
 
 def export_to_excel(
     df: pd.DataFrame,
@@ -60,13 +133,9 @@ def export_to_excel(
     writer: pd.ExcelWriter | None = None,
     sheet_name: str = "Sheet1",
 ) -> None:
-    # pylint: disable=too-many-locals,too-many-arguments
+    # pylint: disable=too-many-locals,too-many-arguments,too-many-branches
     """Write ``df`` to ``filename`` with formatting."""
-    if "Symbol" in df.columns and not df.empty:
-        df["__sort_order"] = df["Symbol"].map({s: i for i, s in enumerate(symbol_order)})
-        df = df.sort_values("__sort_order").drop(columns=["__sort_order"])
-    elif "Symbol" not in df.columns:
-        logger.warning("'Symbol' column missing. Skipping sorting for sheet '%s'", sheet_name)
+    df = sort_by_symbol_order(df, symbol_order, logger, f"sheet '{sheet_name}'")
 
     if "Funding Rate" in df.columns and "24h USD Volume" in df.columns:
         cols = df.columns.tolist()
@@ -79,32 +148,20 @@ def export_to_excel(
     manage_writer = writer is None
     if manage_writer:
         logger.info("Exporting data to Excel: %s", filename)
-        wait_for_file_close(filename, logger)
-        writer = pd.ExcelWriter(filename, engine="xlsxwriter")
+        # Written beside the target and moved into place once complete.
+        writer = pd.ExcelWriter(
+            temp_path(filename), engine="xlsxwriter", engine_kwargs=EXCEL_ENGINE_KWARGS
+        )
     else:
         logger.info("Exporting sheet: %s", sheet_name)
 
-    df.to_excel(writer, index=False, sheet_name=sheet_name, startrow=1)
-    worksheet = writer.sheets[sheet_name]
-    header_format = writer.book.add_format({"bold": True})
-    worksheet.write("A1", header, header_format)
-    worksheet.freeze_panes(2, 0)
+    col_index = {name: i for i, name in enumerate(df.columns)}
+    worksheet = writer.book.add_worksheet(sheet_name)
+    formats = {name: writer.book.add_format(spec) for name, spec in EXCEL_FORMATS.items()}
 
-    red_format = writer.book.add_format({
-        "bg_color": "#FFC7CE",
-        "font_color": "#9C0006",
-    })
-    green_format = writer.book.add_format({
-        "bg_color": "#C6EFCE",
-        "font_color": "#006100",
-    })
-    currency_format = writer.book.add_format({"num_format": "$#,##0.00"})
-    percent_format = writer.book.add_format({"num_format": '0.00"%"'})
-    funding_format = writer.book.add_format({"num_format": '0.0000000%'})
-
-    if "24h USD Volume" in df.columns:
-        col_idx = df.columns.get_loc("24h USD Volume")
-        worksheet.set_column(col_idx, col_idx, None, currency_format)
+    if "24h USD Volume" in col_index:
+        col_idx = col_index["24h USD Volume"]
+        worksheet.set_column(col_idx, col_idx, None, formats["currency"])
 
     percent_columns = [
         name
@@ -124,17 +181,28 @@ def export_to_excel(
             "1M",
             "Open Interest Change",
         ]
-        if name in df.columns
+        if name in col_index
     ]
     for name in percent_columns:
-        col = df.columns.get_loc(name)
-        worksheet.set_column(col, col, None, percent_format)
-
-    if "Funding Rate" in df.columns:
-        idx = df.columns.get_loc("Funding Rate")
-        worksheet.set_column(idx, idx, None, funding_format)
+        col = col_index[name]
+        worksheet.set_column(col, col, None, formats["percent"])
+
+    if "Funding Rate" in col_index:
+        idx = col_index["Funding Rate"]
+        worksheet.set_column(idx, idx, None, formats["funding"])
+
+    # Column formats are set first: in constant memory mode a flushed row
+    # cannot pick them up afterwards.
+    worksheet.write("A1", header, formats["header"])
+    worksheet.write_row(1, 0, df.columns.tolist(), formats["header"])
+    # Stream rows straight into the sheet instead of going through pandas'
+    # cell-by-cell ExcelFormatter. Missing values become blank cells.
+    rows = df.astype(object).where(df.notna(), None)
+    for row_idx, row in enumerate(rows.itertuples(index=False, name=None), start=2):
+        worksheet.write_row(row_idx, 0, row)
+    worksheet.freeze_panes(2, 0)
 
-    if apply_conditional_formatting:
+    if apply_conditional_formatting and not df.empty:
         columns_to_format = [
             name
             for name in [
@@ -149,29 +217,38 @@ def export_to_excel(
                 "Open Interest Change",
                 "Funding Rate",
             ]
-            if name in df.columns
+            if name in col_index
         ]
+        # Data starts on row 3; rules only cover the rows actually written.
+        last_row = len(df) + 2
+        ranges = []
         for name in columns_to_format:
-            col = df.columns.get_loc(name)
-            col_letter = xl_col_to_name(col)
-            cell_range = f"{col_letter}3:{col_letter}1048576"
-            worksheet.conditional_format(cell_range, {
+            col_letter = xl_col_to_name(col_index[name])
+            ranges.append(f"{col_letter}3:{col_letter}{last_row}")
+        if ranges:
+            # One rule pair over every formatted column, not a pair per column.
+            multi_range = " ".join(ranges)
+            worksheet.conditional_format(ranges[0], {
                 "type": "cell",
                 "criteria": ">",
                 "value": 0,
-                "format": green_format
+                "format": formats["green"],
+                "multi_range": multi_range,
             })
-            worksheet.conditional_format(cell_range, {
+            worksheet.conditional_format(ranges[0], {
                 "type": "cell",
                 "criteria": "<",
                 "value": 0,
-                "format": red_format
+                "format": formats["red"],
+                "multi_range": multi_range,
             })
     if manage_writer:
         writer.close()
+        replace_file(temp_path(filename), filename, logger)
 
 
 _OPENED_PATHS: set[str] = set()
+IS_WINDOWS = platform.system() == "Windows"
 
 
 def open_in_edge(file_path: str, logger: logging.Logger) -> None:
@@ -182,7 +259,7 @@ def open_in_edge(file_path: str, logger: logging.Logger) -> None:
 
     _OPENED_PATHS.add(file_path)
 
-    if platform.system() == "Windows":
+    if IS_WINDOWS:
         try:
             subprocess.Popen(  # pylint: disable=consider-using-with
                 ["cmd", "/c", "start", "msedge", file_path]
@@ -205,11 +282,7 @@ def export_to_html(
     refresh_seconds: int = 60,
 ) -> None:
     """Write ``df`` to ``filename`` with a dark theme and auto-refresh."""
-    if "Symbol" in df.columns and not df.empty:
-        df["__sort_order"] = df["Symbol"].map({s: i for i, s in enumerate(symbol_order)})
-        df = df.sort_values("__sort_order").drop(columns=["__sort_order"])
-    elif "Symbol" not in df.columns:
-        logger.warning("'Symbol' column missing. Skipping sorting for file '%s'", filename)
+    df = sort_by_symbol_order(df, symbol_order, logger, f"file '{filename}'")
 
     os.makedirs("html", exist_ok=True)
     path = os.path.join("html", filename)
@@ -314,6 +387,20 @@ def export_to_html(
         f.write("</body></html>")
     open_in_edge(os.path.abspath(path), logger)
 
+# Worker threads shared by every symbol scan in the process.
+SCAN_MAX_WORKERS = int(os.environ.get("SCAN_MAX_WORKERS", "16"))
+
+
+@functools.cache
+def get_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by all scan passes."""
+    executor = ThreadPoolExecutor(
+        max_workers=SCAN_MAX_WORKERS, thread_name_prefix="scan"
+    )
+    atexit.register(executor.shutdown)
+    return executor
+
+
 def submit_symbol_futures(symbols: list[str], executor: ThreadPoolExecutor,
                            logger: logging.Logger, func) -> dict:
     """Return a mapping of futures to their corresponding symbol."""
@@ -326,22 +413,42 @@ def submit_symbol_futures(symbols: list[str], executor: ThreadPoolExecutor,
 def scan_and_collect_results(symbols: list[str],
                              logger: logging.Logger,
                              func=core.process_symbol) -> tuple[list, list]:
-    """Process all symbols concurrently and collect successes and failures."""
+    """Process all symbols concurrently and collect successes and failures.
+
+    At most ``2 * SCAN_MAX_WORKERS`` symbols are queued at a time; each
+    finished one makes room for the next.
+    """
     rows: list[dict] = []
     failed: list[str] = []
-    with ThreadPoolExecutor(max_workers=16) as executor:
-        futures = submit_symbol_futures(symbols, executor, logger, func)
-        for future in tqdm(as_completed(futures), total=len(futures),
-                           desc="Scanning"):
-            symbol = futures[future]
-            result = future.result()
-            if result:
-                rows.append(result)
-            else:
-                failed.append(symbol)
+    executor = get_executor()
+    remaining = iter(symbols)
+    futures = submit_symbol_futures(
+        list(islice(remaining, 2 * SCAN_MAX_WORKERS)), executor, logger, func
+    )
+    with tqdm(total=len(symbols), desc="Scanning") as progress:
+        while futures:
+            # as_completed works on a snapshot of the window, so symbols
+            # submitted as room frees up are collected on the next pass.
+            for future in as_completed(list(futures)):
+                symbol = futures.pop(future)
+                result = future.result()
+                if result:
+                    rows.append(result)
+                else:
+                    failed.append(symbol)
+                progress.update(1)
+                if refill := list(islice(remaining, 1)):
+                    futures.update(submit_symbol_futures(refill, executor, logger, func))
     return rows, failed
 
 
+def prefetch_klines(all_symbols: list[tuple], logger: logging.Logger) -> dict[str, list]:
+    """Fetch klines for every symbol concurrently and return them as a cache."""
+    symbols = [s for s, _ in all_symbols]
+    logger.info("Fetching klines asynchronously for %d symbols", len(symbols))
+    return asyncio.run(core.fetch_all_recent_klines_async(symbols))
+
+
 def run_funding_rate_scan(
     all_symbols: list[tuple],
     logger: logging.Logger,
@@ -349,15 +456,16 @@ def run_funding_rate_scan(
     """Collect the latest funding rate for each symbol."""
 
     logger.info("Scanning funding rates...")
-    rows, _ = scan_and_collect_results(
-        [s for s, _ in all_symbols],
-        logger,
-        core.process_symbol_funding,
-    )
-    df = pd.DataFrame(rows)
+    # One tickers snapshot carries every symbol's funding rate.
+    rates = core.get_funding_rates()
+    symbols = [s for s, _ in all_symbols]
+    df = pd.DataFrame({
+        "Symbol": symbols,
+        "Funding Rate": [rates.get(s, 0.0) for s in symbols],
+    })
     export_to_html(
         df,
-        [s for s, _ in all_symbols],
+        symbols,
         logger,
         filename="funding_rates.html",
         header="Latest Funding Rates",
@@ -374,15 +482,26 @@ def run_open_interest_scan(
     """Collect open interest change metrics for each symbol."""
 
     logger.info("Scanning open interest changes...")
+    symbols = [s for s, _ in all_symbols]
+    oi_cache = asyncio.run(core.fetch_all_open_interest_async(symbols))
     rows, _ = scan_and_collect_results(
-        [s for s, _ in all_symbols],
+        symbols,
         logger,
-        core.process_symbol_open_interest,
+        lambda s, log: core.process_symbol_open_interest(s, log, oi_cache),
     )
+    return export_open_interest(rows, symbols, logger)
+
+
+def export_open_interest(
+    rows: list[dict],
+    symbol_order: list[str],
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """Return open interest ``rows`` as a DataFrame and export them to HTML."""
     df = pd.DataFrame(rows)
     export_to_html(
         df,
-        [s for s, _ in all_symbols],
+        symbol_order,
         logger,
         filename="open_interest.html",
         header="% Change in Open Interest",
@@ -401,19 +520,31 @@ def run_volume_scan(
 
     logger.info("Scanning volume metrics...")
 
+    volume_map = dict(all_symbols)
     rows, failed = scan_and_collect_results(
-        [s for s, _ in all_symbols],
+        list(volume_map),
         logger,
         lambda s, log: core.process_symbol(s, log, klines_cache),
     )
+    return export_volume(rows, failed, volume_map, logger)
 
-    volume_map = dict(all_symbols)
-    for row in rows:
-        row["24h USD Volume"] = volume_map.get(row["Symbol"], 0)
+
+def export_volume(
+    rows: list[dict],
+    failed: list[str],
+    volume_map: dict[str, float],
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """Return volume ``rows`` as a DataFrame and export them to HTML.
+
+    ``volume_map`` maps each symbol, in display order, to its 24h turnover.
+    """
     df = pd.DataFrame(rows)
+    if not df.empty:
+        df["24h USD Volume"] = df["Symbol"].map(volume_map).fillna(0)
     export_to_html(
         df,
-        [s for s, _ in all_symbols],
+        list(volume_map),
         logger,
         filename="volume.html",
         header="% Distance Below or Above 20 Bar Moving Average Volume Indicator",
@@ -432,19 +563,33 @@ def run_scan(
     logger: logging.Logger,
     klines_cache: dict | None = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, list[str]]:
-    """Fetch funding, open interest and volume metrics in sequence."""
+    """Fetch funding, open interest and volume metrics.
 
-    funding_df = run_funding_rate_scan(all_symbols, logger)
-    oi_df = run_open_interest_scan(all_symbols, logger)
-    volume_df = run_volume_scan(all_symbols, logger, klines_cache)
+    Open interest and volume are computed in one pass, one task per symbol,
+    while the funding scan runs alongside it on the shared pool.
+    """
 
-    return (
-        volume_df,
+    funding_future = get_executor().submit(run_funding_rate_scan, all_symbols, logger)
 
-        funding_df,
-        oi_df,
-        [s for s, _ in all_symbols],
+    logger.info("Scanning open interest and volume metrics...")
+    symbols = [s for s, _ in all_symbols]
+    oi_cache = asyncio.run(core.fetch_all_open_interest_async(symbols))
+    rows, _ = scan_and_collect_results(
+        symbols,
+        logger,
+        lambda s, log: core.process_symbol_all(s, log, klines_cache, oi_cache),
     )
+    oi_df = export_open_interest(
+        [row["open_interest"] for row in rows], symbols, logger
+    )
+    volume_df = export_volume(
+        [row["volume"] for row in rows if row["volume"]],
+        [row["open_interest"]["Symbol"] for row in rows if not row["volume"]],
+        dict(all_symbols),
+        logger,
+    )
+
+    return volume_df, funding_future.result(), oi_df, symbols
 
 def run_correlation_matrix_scan(
     all_symbols: list[tuple],
@@ -463,16 +608,16 @@ def run_correlation_matrix_scan(
         logger.warning("BTCUSDT data unavailable. Skipping correlation export.")
         return pd.DataFrame()
 
-    rows, failed = scan_and_collect_results(
+    closes_rows, failed = scan_and_collect_results(
         [s for s, _ in all_symbols],
         logger,
-        lambda s, log: core.process_symbol_correlation(s, btc_klines, log, klines_cache),
+        lambda s, log: core.symbol_closes(s, log, klines_cache),
     )
 
     if failed:
         logger.warning("%d symbols failed: %s", len(failed), ", ".join(failed))
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(core.correlation_rows(closes_rows, btc_klines))
     logger.info("Correlation data collected for %d symbols", len(df))
 
     return df
@@ -492,8 +637,9 @@ def export_all_data(
 ) -> None:
     """Write all metric DataFrames to an Excel file."""
 
-    wait_for_file_close(filename, logger)
-    with pd.ExcelWriter(filename, engine="xlsxwriter") as writer:
+    with pd.ExcelWriter(
+        temp_path(filename), engine="xlsxwriter", engine_kwargs=EXCEL_ENGINE_KWARGS
+    ) as writer:
         export_to_excel(
             volume_df,
             symbol_order,
@@ -518,6 +664,7 @@ def export_all_data(
             writer=writer,
             sheet_name="Open Interest",
         )
+    replace_file(temp_path(filename), filename, logger)
     logger.info("Export complete: %s", filename)
 
 
@@ -604,7 +751,7 @@ def export_all_data_html(
 
 def main() -> None:
     """Entry point for running the scanner from the command line."""
-    logger = setup_logging()
+    logger = setup_logging(buffered=True)
     try:
         logger.info("Fetching USDT perpetual futures from Bybit...")
         all_symbols = core.get_tradeable_symbols_sorted_by_volume()
@@ -616,15 +763,18 @@ def main() -> None:
 
         clean_existing_excels(logger)
 
-        symbols_only = [s for s, _ in all_symbols]
-        logger.info("Fetching klines asynchronously for %d symbols", len(symbols_only))
-        klines_cache = asyncio.run(core.fetch_all_recent_klines_async(symbols_only))
+        # Bars stored by the last run only need the newer pages fetched.
+        core.load_kline_history()
+        klines_cache = prefetch_klines(all_symbols, logger)
+        core.save_kline_history()
 
         volume_df, funding_df, oi_df, symbol_order = run_scan(all_symbols, logger, klines_cache)
         corr_df = run_correlation_matrix_scan(all_symbols, logger, klines_cache)
 
-        export_correlation_matrices(corr_df, logger)
-
+        # The two workbooks are independent files, so write them side by side.
+        correlation_export = get_executor().submit(
+            export_correlation_matrices, corr_df, logger
+        )
         export_all_data(
             volume_df,
             funding_df,
@@ -632,6 +782,7 @@ def main() -> None:
             symbol_order,
             logger,
         )
+        correlation_export.result()
     except (RuntimeError, ValueError, TypeError) as exc:
         logger.exception("Script failed: %s", exc)
 
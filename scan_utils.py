@@ -1,18 +1,41 @@
 """Utility functions for the scanning workflow."""
 
+import os
 import time
 import logging
 
+MAX_WAIT_DELAY = 2.0
+
 
 def wait_for_file_close(path: str, logger: logging.Logger | None = None) -> None:
-    """Sleep until ``path`` can be opened for writing."""
+    """Sleep until ``path`` can be opened for writing.
+
+    The delay between attempts doubles up to ``MAX_WAIT_DELAY`` seconds, so a
+    file left open for long is not reopened ten times a second.
+    """
     if logger is None:
         logger = logging.getLogger("volume_logger")
+    delay = 0.1
     while True:
         try:
             with open(path, "a", encoding="utf-8"):
                 return
         except OSError:
             logger.debug("Waiting for %s to be released", path)
-            time.sleep(0.1)
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_WAIT_DELAY)
+
+
+def temp_path(path: str) -> str:
+    """Return the sibling path ``path`` is written to before ``replace_file``."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{ext}"
+
 
+def replace_file(tmp_path: str, path: str, logger: logging.Logger | None = None) -> None:
+    """Move ``tmp_path`` onto ``path``, waiting first if ``path`` is held open."""
+    try:
+        os.replace(tmp_path, path)
+    except PermissionError:
+        wait_for_file_close(path, logger)
+        os.replace(tmp_path, path)
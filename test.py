@@ -3,16 +3,39 @@ Unit test suite for Bybit volume anomaly scanner.
 Tests include symbol sorting, kline deduplication, volume spike/dip detection,
 and Excel export behavior. Supports pytest + pylint 10/10 compliance.
 """
+# pylint: disable=too-many-lines
 
+import asyncio
 import logging
-from unittest.mock import patch, MagicMock, PropertyMock
+import logging.handlers
+import threading
+from unittest.mock import patch, MagicMock, PropertyMock, AsyncMock
 from datetime import datetime, timezone, timedelta
+import json
+import numpy as np
 import pandas as pd
+import pytest
 import core
 import scan
+import continuous_scan
+import group_logs
+import volume_math
 from volume_math import calculate_volume_change
 import correlation_math
 import percentile_math
+import scan_utils
+import volatility_math
+
+
+@pytest.fixture(autouse=True)
+def reset_caches(monkeypatch):
+    """Isolate tests from module-level caches in ``core``."""
+    monkeypatch.setattr(core, "KLINE_HISTORY", {})
+    monkeypatch.setattr(core, "_TICKERS_CACHE", {})
+    monkeypatch.setattr(core, "_KLINE_COLUMNS", {})
+    monkeypatch.setattr(core, "_RECENT_KLINES", {})
+    monkeypatch.setattr(core, "_OPEN_INTEREST_CACHE", {})
+
 
 def test_get_tradeable_symbols_sorted_by_volume():
     """Test symbol sorting by 24h volume descending order."""
@@ -25,15 +48,17 @@ def test_get_tradeable_symbols_sorted_by_volume():
             ]
         }
     }
-    with patch("core.requests.get") as mock_get:
+    with patch("core.SESSION.get") as mock_get:
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_response
+        mock_get.return_value.content = json.dumps(mock_response).encode()
         result = core.get_tradeable_symbols_sorted_by_volume()
         assert result == [
             ("BTCUSDT", 500000000.0),
             ("ETHUSDT", 300000000.0),
             ("DOGEUSDT", 100000000.0)
         ]
+        top = core.get_tradeable_symbols_sorted_by_volume(top_k=2)
+        assert top == result[:2]
 
 def test_fetch_recent_klines_exact_count():
     """Test fetch returns the exact number of klines requested."""
@@ -42,9 +67,9 @@ def test_fetch_recent_klines_exact_count():
         for i in range(10080)
     ]
     mock_response = {"result": {"list": mock_klines}}
-    with patch("core.requests.get") as mock_get:
+    with patch("core.SESSION.get") as mock_get:
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_response
+        mock_get.return_value.content = json.dumps(mock_response).encode()
         result = core.fetch_recent_klines("BTCUSDT", total=10080)
         assert isinstance(result, list)
         assert len(result) == 10080
@@ -61,31 +86,53 @@ def test_fetch_recent_klines_insufficient():
 
     def side_effect(*_, **__):
         if responses:
-            return MagicMock(status_code=200, json=lambda: responses.pop(0))
-        return MagicMock(status_code=200, json=lambda: {"result": {"list": []}})
+            return MagicMock(status_code=200, content=json.dumps(responses.pop(0)).encode())
+        return MagicMock(status_code=200, content=json.dumps({"result": {"list": []}}).encode())
 
-    with patch("core.requests.get", side_effect=side_effect):
+    with patch("core.SESSION.get", side_effect=side_effect):
         result = core.fetch_recent_klines("BTCUSDT", total=10080)
         assert result == []
 
-def test_clean_existing_excels(tmp_path):
+def test_clean_existing_excels(tmp_path, monkeypatch):
     """Test Excel file cleanup removes files as expected."""
     dummy_file = tmp_path / "file.xlsx"
     dummy_file.write_text("data")
+    (tmp_path / "notes.txt").write_text("keep")
+    (tmp_path / "folder.xlsx").mkdir()
+    monkeypatch.chdir(tmp_path)
 
-    with patch("scan.os.listdir", return_value=["file.xlsx"]), \
-         patch("scan.os.remove") as mock_remove, \
+    with patch("scan.os.remove") as mock_remove, \
          patch("scan.wait_for_file_close") as mock_wait:
         scan.clean_existing_excels()
-        mock_wait.assert_called_once()
+        mock_wait.assert_not_called()
         mock_remove.assert_called_once_with("file.xlsx")
 
+
+def test_clean_existing_excels_waits_for_locked_file(tmp_path, monkeypatch):
+    """A workbook that cannot be removed yet is waited on and removed again."""
+    (tmp_path / "file.xlsx").write_text("data")
+    monkeypatch.chdir(tmp_path)
+
+    with patch("scan.os.remove", side_effect=[PermissionError, None]) as mock_remove, \
+         patch("scan.wait_for_file_close") as mock_wait:
+        scan.clean_existing_excels()
+        mock_wait.assert_called_once()
+        assert mock_remove.call_count == 2
+
 def test_setup_logging():
     """Test logger is created with correct config."""
     logger = scan.setup_logging()
     assert isinstance(logger, logging.Logger)
     assert logger.name == "volume_logger"
     assert logger.level == logging.INFO
+    assert any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers)
+
+def test_debug_logger_writes_through_queue():
+    """The debug logger hands records to a background listener."""
+    logger = core.get_debug_logger()
+    assert logger is core.get_debug_logger()
+    assert any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers)
+
 
 def test_process_symbol_with_mocked_logger():
     """Ensure process_symbol runs with valid klines and mocked logger."""
@@ -117,6 +164,16 @@ def test_calculate_price_correlation_perfect():
     assert round(result, 6) == 1.0
 
 
+def test_kline_column_sorts_once_per_list():
+    """Columns come back oldest-first and are reused for the same list."""
+    klines = [["2", "", "", "", "20", "2"], ["1", "", "", "", "10", "1"]]
+    closes = core.kline_column("BTCUSDT", klines, "close")
+    assert closes.tolist() == [10.0, 20.0]
+    assert core.kline_column("BTCUSDT", klines, "close") is closes
+    assert core.kline_column("BTCUSDT", klines, "volume").tolist() == [1.0, 2.0]
+    assert core.kline_column("BTCUSDT", list(klines), "close") is not closes
+
+
 def test_process_symbol_correlation_with_mocked_logger():
     """Ensure correlation processing returns expected keys."""
     mock_klines = [[str(i), "", "", "", str(i), "2"] for i in range(10080)]
@@ -156,6 +213,50 @@ def test_process_symbol_open_interest_with_mocked_logger():
         assert set(result.keys()) == expected
 
 
+def test_process_symbol_open_interest_fetches_each_interval_once():
+    """Daily history is shared by the 1D, 1W and 1M metrics."""
+    data = [{"openInterest": str(100 + i), "timestamp": str(i)} for i in range(50)]
+    with patch("core.get_open_interest_history", return_value=data) as mock_hist:
+        core.process_symbol_open_interest("XRPUSDT", MagicMock())
+        intervals = [c.args[1] for c in mock_hist.call_args_list]
+        assert sorted(intervals) == sorted(["5min", "15min", "30min", "1h", "4h", "1d"])
+
+
+def test_fetch_all_open_interest_async_feeds_processing():
+    """Prefetched histories are grouped per symbol and used without refetching."""
+    data = [{"timestamp": str(i), "openInterest": str(100 + i)} for i in range(40)]
+
+    async def fake_history(*_, client):
+        assert client is not None
+        return data
+
+    with patch("core.get_open_interest_history_async", side_effect=fake_history) as mock_async:
+        cache = asyncio.run(core.fetch_all_open_interest_async(["XRPUSDT", "BTCUSDT"]))
+    assert mock_async.call_count == 12
+    assert set(cache) == {"XRPUSDT", "BTCUSDT"}
+    assert set(cache["XRPUSDT"]) == {"5min", "15min", "30min", "1h", "4h", "1d"}
+
+    with patch("core.get_open_interest_history") as mock_hist:
+        result = core.process_symbol_open_interest("XRPUSDT", MagicMock(), cache)
+        mock_hist.assert_not_called()
+    assert result["5M"] > 0
+
+
+def test_get_open_interest_history_async_retries_rate_limit():
+    """A 429 is retried after backing off instead of yielding no history."""
+    limited = MagicMock(status_code=429, headers={})
+    rows = [{"timestamp": "2", "openInterest": "101"}, {"timestamp": "1", "openInterest": "100"}]
+    good = MagicMock(status_code=200, content=json.dumps({"result": {"list": rows}}).encode())
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[limited, good])
+    with patch("core.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        result = asyncio.run(
+            core.get_open_interest_history_async("BTCUSDT", "1h", client=client)
+        )
+    assert mock_sleep.await_count == 1
+    assert [row["timestamp"] for row in result] == ["1", "2"]
+
+
 def test_get_open_interest_changes_calls_expected_params():
     """Verify week and month calculations use daily data."""
     with patch("core.get_open_interest_change", return_value=5.0) as mock_oi:
@@ -172,6 +273,15 @@ def test_process_symbol_funding_with_mocked_logger():
         result = core.process_symbol_funding("XRPUSDT", MagicMock())
         assert result == {"Symbol": "XRPUSDT", "Funding Rate": 0.001}
 
+def test_oldest_first_orders_open_interest_rows():
+    """Newest-first rows are reversed and mixed rows fully sorted."""
+    rows = [{"timestamp": str(ts)} for ts in (3, 2, 1)]
+    assert core._oldest_first(rows) == rows[::-1]  # pylint: disable=protected-access
+    mixed = [{"timestamp": str(ts)} for ts in (2, 3, 1)]
+    ordered = core._oldest_first(mixed)  # pylint: disable=protected-access
+    assert [r["timestamp"] for r in ordered] == ["1", "2", "3"]
+
+
 def test_get_funding_rate_success_timestamp():
     """Ensure timestamp reflects when the rate was fetched."""
     ts = int((datetime.now(timezone.utc) - timedelta(minutes=5)).timestamp() * 1000)
@@ -179,9 +289,9 @@ def test_get_funding_rate_success_timestamp():
         "result": {"list": [{"fundingRate": "0.0001"}]},
         "time": str(ts)
     }
-    with patch("core.requests.get") as mock_get:
+    with patch("core.SESSION.get") as mock_get:
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_data
+        mock_get.return_value.content = json.dumps(mock_data).encode()
         rate, ts_returned = core.get_funding_rate("BTCUSDT")
         assert rate == 0.0001
         assert ts_returned == ts
@@ -196,13 +306,26 @@ def test_get_open_interest_change():
             ]
         }
     }
-    with patch("core.requests.get") as mock_get:
+    with patch("core.SESSION.get") as mock_get:
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_data
+        mock_get.return_value.content = json.dumps(mock_data).encode()
         change = core.get_open_interest_change("BTCUSDT")
         assert round(change, 4) == 10.0
 
 
+def test_get_open_interest_history_reused_within_period():
+    """History is refetched only once its interval period has rolled over."""
+    mock_data = {"result": {"list": [{"timestamp": "2", "openInterest": "1"}]}}
+    with patch("core.SESSION.get") as mock_get, \
+         patch("core.time.time") as mock_time:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(mock_data).encode()
+        for now in (3600.0, 7199.0, 7200.0):
+            mock_time.return_value = now
+            core.get_open_interest_history("BTCUSDT", "1h", 24)
+        assert mock_get.call_count == 2
+
+
 def test_get_open_interest_change_sorts_by_timestamp():
     """Ensure change calculation sorts rows by timestamp."""
     mock_data = {
@@ -213,9 +336,9 @@ def test_get_open_interest_change_sorts_by_timestamp():
             ]
         }
     }
-    with patch("core.requests.get") as mock_get:
+    with patch("core.SESSION.get") as mock_get:
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_data
+        mock_get.return_value.content = json.dumps(mock_data).encode()
         change = core.get_open_interest_change("BTCUSDT")
         assert round(change, 4) == 10.0
 
@@ -276,6 +399,13 @@ def test_calculate_volume_change_invalid_data():
     result = calculate_volume_change(bad_klines, 15)
     assert result == 0.0
 
+def test_calculate_volume_change_newest_first():
+    """Newest-first klines give the same result as oldest-first input."""
+    klines = [[str(i), "", "", "", "", str(1 + (i >= 300) * 9)] for i in range(315)]
+    expected = calculate_volume_change(klines, 15)
+    assert expected > 800
+    assert calculate_volume_change(klines[::-1], 15) == expected
+
 def test_calculate_volume_change_4h():
     """Detects a volume shift in 4h block size (240 klines)."""
     baseline = [[str(i), "", "", "", "", "5"] for i in range(240)]
@@ -284,6 +414,14 @@ def test_calculate_volume_change_4h():
     result = calculate_volume_change(klines, 240)
     assert result > 400
 
+def test_block_changes_matches_block_sums():
+    """Each change compares a block with the average of the 20 before it."""
+    volumes = np.array([1.0] * 100 + [3.0] * 5)
+    sums = volume_math.block_sums(volumes, 5)
+    assert sums.tolist() == [5.0] * 20 + [15.0]
+    assert volume_math.block_changes(sums).tolist() == [200.0]
+    assert volume_math.block_changes(sums[:-1]).size == 0
+
 
 
 
@@ -302,28 +440,31 @@ def test_export_to_excel_swaps_column_order():
         }
     ])
     logger = MagicMock()
-    captured = {}
     with patch("scan.pd.ExcelWriter") as mock_writer, \
-         patch("scan.wait_for_file_close"), \
-         patch("pandas.DataFrame.to_excel", autospec=True) as mock_to_excel:
+         patch("scan.replace_file"):
         writer = MagicMock()
         writer.book.add_format.return_value = MagicMock()
-        writer.sheets = {"Sheet1": MagicMock()}
-        mock_writer.return_value.__enter__.return_value = writer
-
-        def capture(self, *args, **kwargs):  # pylint: disable=unused-argument
-            captured["cols"] = list(self.columns)
-
-        mock_to_excel.side_effect = capture
+        worksheet = MagicMock()
+        writer.book.add_worksheet.return_value = worksheet
+        mock_writer.return_value = writer
 
         scan.export_to_excel(df, ["BTCUSDT"], logger)
-        cols = captured.get("cols")
+        cols = worksheet.write_row.call_args_list[0].args[2]
         assert cols.index("24h USD Volume") < cols.index("Funding Rate")
 
 
 
 
 
+def test_prefetch_klines_fetches_all_symbols_concurrently():
+    """Prefetching hands every symbol to the async fetcher in one call."""
+    fetch_all = AsyncMock(return_value={"BTCUSDT": [["1"]]})
+    with patch("scan.core.fetch_all_recent_klines_async", fetch_all):
+        cache = scan.prefetch_klines([("BTCUSDT", 1), ("ETHUSDT", 2)], MagicMock())
+    fetch_all.assert_awaited_once_with(["BTCUSDT", "ETHUSDT"])
+    assert cache == {"BTCUSDT": [["1"]]}
+
+
 def test_run_correlation_scan():
     """Correlation scan returns dataframe without exporting HTML."""
     mock_klines = [[str(i), "", "", "", str(i), "1"] for i in range(10080)]
@@ -362,6 +503,14 @@ def test_percentile_rank_basic():
     assert round(pct, 2) == 0.7
 
 
+def test_latest_percentile_matches_percentile_rank():
+    """Ranking the last change agrees with percentile_rank, ties included."""
+    changes = np.array([1.0, 2.0, 3.0, 3.0, 4.0, 3.0])
+    expected = percentile_math.percentile_rank(changes[:-1].tolist(), 3.0)
+    assert percentile_math.latest_percentile(changes) == pytest.approx(expected)
+    assert percentile_math.latest_percentile(np.array([5.0])) == 0.0
+
+
 def test_export_to_excel_skips_conditional_formatting():
     """No conditional formatting applied when flag is False."""
     df = pd.DataFrame([
@@ -369,13 +518,12 @@ def test_export_to_excel_skips_conditional_formatting():
     ])
     logger = MagicMock()
     with patch("scan.pd.ExcelWriter") as mock_writer, \
-         patch("scan.wait_for_file_close"), \
-         patch("pandas.DataFrame.to_excel", autospec=True):
+         patch("scan.replace_file"):
         writer = MagicMock()
         writer.book.add_format.return_value = MagicMock()
         worksheet = MagicMock()
-        writer.sheets = {"Sheet1": worksheet}
-        mock_writer.return_value.__enter__.return_value = writer
+        writer.book.add_worksheet.return_value = worksheet
+        mock_writer.return_value = writer
 
         scan.export_to_excel(df, ["BTCUSDT"], logger,
                              filename="x.xlsx", header="hdr",
@@ -383,6 +531,38 @@ def test_export_to_excel_skips_conditional_formatting():
         worksheet.conditional_format.assert_not_called()
 
 
+def test_export_to_excel_streams_in_constant_memory():
+    """Column formats are set before any row is flushed to disk."""
+    df = pd.DataFrame([{"Symbol": "BTCUSDT", "5M": 1.0}])
+    with patch("scan.pd.ExcelWriter") as mock_writer, \
+         patch("scan.replace_file"):
+        writer = MagicMock()
+        worksheet = MagicMock()
+        writer.book.add_worksheet.return_value = worksheet
+        mock_writer.return_value = writer
+
+        scan.export_to_excel(df, ["BTCUSDT"], MagicMock())
+        assert mock_writer.call_args.kwargs["engine_kwargs"]["options"]["constant_memory"]
+        calls = [name for name, _, _ in worksheet.mock_calls]
+        assert calls.index("set_column") < calls.index("write_row")
+
+
+def test_export_to_excel_formats_columns_with_one_rule_pair():
+    """All highlighted columns share a single green and a single red rule."""
+    df = pd.DataFrame([{"Symbol": "BTCUSDT", "5M": 1.0, "5M Percentile": 0.5, "1H": -1.0}])
+    with patch("scan.pd.ExcelWriter") as mock_writer, \
+         patch("scan.replace_file"):
+        writer = MagicMock()
+        worksheet = MagicMock()
+        writer.book.add_worksheet.return_value = worksheet
+        mock_writer.return_value = writer
+
+        scan.export_to_excel(df, ["BTCUSDT"], MagicMock())
+        assert worksheet.conditional_format.call_count == 2
+        for call in worksheet.conditional_format.call_args_list:
+            assert call.args[1]["multi_range"] == "B3:B3 D3:D3"
+
+
 def test_export_to_excel_does_not_merge_cells():
     """Header is written directly and no cells are merged."""
     df = pd.DataFrame([
@@ -390,13 +570,12 @@ def test_export_to_excel_does_not_merge_cells():
     ])
     logger = MagicMock()
     with patch("scan.pd.ExcelWriter") as mock_writer, \
-         patch("scan.wait_for_file_close"), \
-         patch("pandas.DataFrame.to_excel", autospec=True):
+         patch("scan.replace_file"):
         writer = MagicMock()
         fmt = MagicMock()
         writer.book.add_format.return_value = fmt
         worksheet = MagicMock()
-        writer.sheets = {"Sheet1": worksheet}
+        writer.book.add_worksheet.return_value = worksheet
         mock_writer.return_value = writer
 
         scan.export_to_excel(df, ["BTCUSDT"], logger,
@@ -412,13 +591,12 @@ def test_export_to_excel_formats_percentile_columns():
     ])
     logger = MagicMock()
     with patch("scan.pd.ExcelWriter") as mock_writer, \
-         patch("scan.wait_for_file_close"), \
-         patch("pandas.DataFrame.to_excel", autospec=True):
+         patch("scan.replace_file"):
         writer = MagicMock()
         fmt = MagicMock()
         writer.book.add_format.return_value = fmt
         worksheet = MagicMock()
-        writer.sheets = {"Sheet1": worksheet}
+        writer.book.add_worksheet.return_value = worksheet
         mock_writer.return_value = writer
 
         scan.export_to_excel(df, ["BTCUSDT"], logger)
@@ -466,3 +644,458 @@ def test_export_to_html_includes_volume_button(tmp_path):
         )
     content = out_file.read_text(encoding="utf-8")
     assert "sortBy('24h USD Volume')" in content
+
+
+def test_stable_chunk_hash_uses_timestamps():
+    """Chunks covering the same window share a key regardless of payload."""
+    chunk = [["3", "", "", "", "", "1"], ["2", "", "", "", "", "1"]]
+    stale = [["3", "", "", "", "", "9"], ["2", "", "", "", "", "9"]]
+    assert core.stable_chunk_hash(chunk) == core.stable_chunk_hash(stale)
+    assert core.stable_chunk_hash(chunk) != core.stable_chunk_hash(chunk[:1])
+
+
+def test_collect_kline_pages_stitches_oldest_first():
+    """Newest-first Bybit pages are stitched into one ascending series."""
+    newer = [[str(ts), "", "", "", "", "1"] for ts in (6, 5, 4)]
+    older = [[str(ts), "", "", "", "", "1"] for ts in (3, 2, 1)]
+    klines = core._collect_kline_pages(  # pylint: disable=protected-access
+        "BTCUSDT", 10, [newer, older], MagicMock()
+    )
+    assert [k[0] for k in klines] == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_fetch_recent_klines_stops_at_requested_window():
+    """Paging stops once the requested window is covered, even with gaps."""
+    pages = iter(range(10))
+
+    def side_effect(*_, **__):
+        page = next(pages)
+        chunk = [[str(page * 1000 + i), "", "", "", "", "1"] for i in range(200)]
+        return MagicMock(status_code=200, content=json.dumps({"result": {"list": chunk}}).encode())
+
+    with patch("core.SESSION.get", side_effect=side_effect) as mock_get:
+        result = core.fetch_recent_klines("BTCUSDT", total=2500)
+        assert mock_get.call_count == 3
+        assert len(result) == 600
+        assert "&end=" in mock_get.call_args.args[0]
+
+
+def test_fetch_recent_klines_async_requests_pages_concurrently():
+    """Every page window is requested up front and stitched oldest-first."""
+    minute = 60000
+    end_time = 1717382400000
+
+    async def fake_get(url, **_):
+        params = dict(part.split("=") for part in url.split("?")[1].split("&"))
+        start, end = int(params["start"]), int(params["end"])
+        newest = end + 1 - minute
+        chunk = [[str(ts), "", "", "", "", "1"] for ts in range(newest, start - 1, -minute)]
+        body = {"result": {"list": chunk}}
+        return MagicMock(status_code=200, content=json.dumps(body).encode())
+
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=fake_get)
+    with patch("core.get_kline_end_time", return_value=end_time):
+        result = asyncio.run(core.fetch_recent_klines_async("BTCUSDT", total=2500, client=client))
+    assert client.get.await_count == 3
+    assert len(result) == 2500
+    timestamps = [int(k[0]) for k in result]
+    assert timestamps == sorted(timestamps)
+    assert len(set(timestamps)) == 2500
+
+
+def test_get_tradeable_symbols_reuses_recent_result():
+    """Symbols fetched within the TTL are served without another request."""
+    mock_response = {"result": {"list": [{"symbol": "BTCUSDT", "turnover24h": "5"}]}}
+    with patch("core.SESSION.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(mock_response).encode()
+        first = core.get_tradeable_symbols_sorted_by_volume(ttl=0)
+        second = core.get_tradeable_symbols_sorted_by_volume(ttl=60)
+        assert first == second == [("BTCUSDT", 5.0)]
+        assert mock_get.call_count == 1
+
+
+def test_export_to_excel_writes_rows():
+    """Rows follow the symbol order and missing values become blanks."""
+    df = pd.DataFrame([
+        {"Symbol": "ETHUSDT", "5M": 2.0},
+        {"Symbol": "BTCUSDT", "5M": None},
+    ])
+    with patch("scan.pd.ExcelWriter") as mock_writer, \
+         patch("scan.replace_file"):
+        writer = MagicMock()
+        worksheet = MagicMock()
+        writer.book.add_worksheet.return_value = worksheet
+        mock_writer.return_value = writer
+
+        scan.export_to_excel(df, ["BTCUSDT", "ETHUSDT"], MagicMock())
+        worksheet.write_row.assert_any_call(2, 0, ("BTCUSDT", None))
+        worksheet.write_row.assert_any_call(3, 0, ("ETHUSDT", 2.0))
+
+
+def test_export_to_excel_writes_infinite_values(tmp_path, monkeypatch):
+    """An infinite ratio is written as a cell error instead of failing the export."""
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame([{"Symbol": "BTCUSDT", "5M": np.inf}, {"Symbol": "ETHUSDT", "5M": -np.inf}])
+    scan.export_to_excel(df, ["BTCUSDT", "ETHUSDT"], MagicMock(), filename="out.xlsx")
+    assert (tmp_path / "out.xlsx").stat().st_size > 0
+
+
+def test_fetch_recent_klines_extends_stored_history():
+    """A repeat fetch only requests bars newer than the stored history."""
+    minute = 60000
+    end_time = 1717382400000
+    history = [[str(end_time - (400 - i) * minute), "", "", "", "", "1"] for i in range(400)]
+    core.KLINE_HISTORY[("BTCUSDT", "1")] = history
+    fresh = [[str(end_time - i * minute), "", "", "", "", "2"] for i in range(3)]
+    with patch("core.get_kline_end_time", return_value=end_time), \
+         patch("core.SESSION.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps({"result": {"list": fresh}}).encode()
+        result = core.fetch_recent_klines("BTCUSDT", total=350)
+        assert mock_get.call_count == 1
+        assert len(result) == 350
+        assert result[-1] == fresh[0]
+        assert [int(k[0]) for k in result] == sorted(int(k[0]) for k in result)
+
+
+def test_fetch_recent_klines_rejects_failed_refresh():
+    """Stored history is not served as current when every page fails."""
+    minute = 60000
+    end_time = 1717382400000
+    history = [[str(end_time - (400 - i) * minute), "", "", "", "", "1"] for i in range(400)]
+    core.KLINE_HISTORY[("BTCUSDT", "1")] = history
+    with patch("core.get_kline_end_time", return_value=end_time), \
+         patch("core.fetch_with_backoff", return_value=[]):
+        assert not core.fetch_recent_klines("BTCUSDT", total=350)
+
+
+def test_fetch_recent_klines_rejects_gap_before_history():
+    """A failed older page is not bridged by splicing on stored history."""
+    minute = 60000
+    end_time = 1717382400000
+    history = [[str(end_time - (1600 - i) * minute), "", "", "", "", "1"] for i in range(400)]
+    core.KLINE_HISTORY[("BTCUSDT", "1")] = history
+    newest = [[str(end_time - i * minute), "", "", "", "", "2"] for i in range(1, 1001)]
+    with patch("core.get_kline_end_time", return_value=end_time), \
+         patch("core.fetch_with_backoff", side_effect=[newest, []]) as mock_fetch:
+        assert not core.fetch_recent_klines("BTCUSDT", total=1500)
+        assert mock_fetch.call_count == 2
+
+
+def test_fetch_recent_klines_reuses_current_window():
+    """A second fetch in the same window is served without any requests."""
+    chunk = [[str(i), "", "", "", "", "1"] for i in range(400)]
+    with patch("core.get_kline_end_time", return_value=1717382400000), \
+         patch("core.fetch_with_backoff", side_effect=[chunk, []]) as mock_fetch:
+        first = core.fetch_recent_klines("BTCUSDT", total=400)
+        second = core.fetch_recent_klines("BTCUSDT", total=400)
+        assert first is second
+        assert mock_fetch.call_count == 1
+
+
+def test_kline_history_round_trips_through_disk(tmp_path):
+    """Saved history is restored by the next run; a missing file is ignored."""
+    path = str(tmp_path / "cache" / "kline_history.npz")
+    core.load_kline_history(path)
+    assert not core.KLINE_HISTORY
+    core.KLINE_HISTORY[("BTCUSDT", "1")] = [
+        ["1717382400000", "67000.5", "67100.25", "66900.75", "67050.5", "12.25", "821000.5"]
+    ]
+    core.save_kline_history(path)
+    core.KLINE_HISTORY.clear()
+    core.load_kline_history(path)
+    restored = core.KLINE_HISTORY[("BTCUSDT", "1")]
+    assert restored == [
+        ["1717382400000", "67000.5", "67100.25", "66900.75", "67050.5", "12.25", "821000.5"]
+    ]
+    assert volatility_math.calculate_price_range_percent(restored, 1) > 0
+
+
+def test_kline_history_skips_unreadable_file(tmp_path):
+    """A corrupt history file is ignored rather than aborting the run."""
+    path = tmp_path / "kline_history.npz"
+    path.write_bytes(b"not a zip")
+    core.load_kline_history(str(path))
+    assert not core.KLINE_HISTORY
+
+
+def test_fetch_recent_klines_does_not_store_partial_window():
+    """A short fetch is returned but not kept as history to extend later."""
+    chunk = [[str(1717382400000 - i * 60000), "", "", "", "", "1"] for i in range(400)]
+    with patch("core.get_kline_end_time", return_value=1717382400000), \
+         patch("core.fetch_with_backoff", side_effect=[chunk, []]):
+        assert len(core.fetch_recent_klines("BTCUSDT", total=1500)) == 400
+    assert not core.KLINE_HISTORY
+
+
+def test_fetch_with_backoff_retries_malformed_json():
+    """An undecodable body is retried like any other request error."""
+    bad = MagicMock(status_code=200, content=b"<html>")
+    good = MagicMock(status_code=200, content=b'{"result": {"list": [["1"]]}}')
+    with patch("core.SESSION.get", side_effect=[bad, good]), \
+         patch("core.time.sleep"):
+        assert core.fetch_with_backoff("url", "BTCUSDT", MagicMock()) == [["1"]]
+
+
+def test_retry_delay_prefers_rate_limit_headers():
+    """Server hints set the delay; otherwise it grows per attempt, capped."""
+    assert core.retry_delay(0, {"Retry-After": "2"}) == 2.0
+    with patch("core.time.time", return_value=100.0):
+        reset = {"X-Bapi-Limit-Reset-Timestamp": "101500"}
+        assert core.retry_delay(0, reset) == 1.5
+    assert 0.5 <= core.retry_delay(0, {}) <= 1.0
+    assert 2.0 <= core.retry_delay(2) <= 2.5
+    assert core.retry_delay(10) <= core.BACKOFF_CAP + core.BACKOFF_BASE
+
+
+def test_fetch_with_backoff_async_retries_malformed_json():
+    """The async fetcher decodes with orjson and retries undecodable bodies."""
+    bad = MagicMock(status_code=200, content=b"<html>")
+    good = MagicMock(status_code=200, content=b'{"result": {"list": [["1"]]}}')
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[bad, good])
+    with patch("core.asyncio.sleep", new=AsyncMock()):
+        result = asyncio.run(core.fetch_with_backoff_async("url", "BTCUSDT", MagicMock(), client))
+    assert result == [["1"]]
+
+
+def test_run_funding_rate_scan_uses_single_snapshot():
+    """Funding rates for all symbols come from one tickers request."""
+    mock_response = {
+        "result": {
+            "list": [
+                {"symbol": "BTCUSDT", "fundingRate": "0.0001"},
+                {"symbol": "ETHUSDT", "fundingRate": "-0.0002"},
+            ]
+        }
+    }
+    with patch("core.SESSION.get") as mock_get, patch("scan.export_to_html"):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(mock_response).encode()
+        df = scan.run_funding_rate_scan(
+            [("BTCUSDT", 2), ("ETHUSDT", 1), ("XRPUSDT", 0)], MagicMock()
+        )
+        assert mock_get.call_count == 1
+        assert df["Funding Rate"].tolist() == [0.0001, -0.0002, 0.0]
+
+
+def test_run_scan_processes_each_symbol_once():
+    """Volume and open interest rows come from one task per symbol."""
+    volume = {"BTCUSDT": {"Symbol": "BTCUSDT", "5M": 1.0}, "ETHUSDT": None}
+    with patch("scan.core.fetch_all_open_interest_async", new=AsyncMock(return_value={})), \
+         patch("scan.core.get_funding_rates", return_value={}), \
+         patch("scan.core.process_symbol", side_effect=lambda s, *_: volume[s]), \
+         patch("scan.core.process_symbol_open_interest",
+               side_effect=lambda s, *_: {"Symbol": s, "5M": 2.0}), \
+         patch("scan.submit_symbol_futures",
+               wraps=scan.submit_symbol_futures) as mock_submit, \
+         patch("scan.export_to_html"):
+        volume_df, _, oi_df, order = scan.run_scan(
+            [("BTCUSDT", 2.0), ("ETHUSDT", 1.0)], MagicMock()
+        )
+    assert mock_submit.call_count == 1
+    assert volume_df.to_dict("records") == [
+        {"Symbol": "BTCUSDT", "5M": 1.0, "24h USD Volume": 2.0}
+    ]
+    assert sorted(oi_df["Symbol"]) == ["BTCUSDT", "ETHUSDT"]
+    assert order == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_export_volume_maps_turnover():
+    """Turnover is joined by symbol, with 0 for unknown symbols."""
+    rows = [{"Symbol": "BTCUSDT", "5M": 1.0}, {"Symbol": "XRPUSDT", "5M": 2.0}]
+    with patch("scan.export_to_html"):
+        df = scan.export_volume(rows, [], {"BTCUSDT": 5.0}, MagicMock())
+        assert df["24h USD Volume"].tolist() == [5.0, 0.0]
+        assert scan.export_volume([], [], {"BTCUSDT": 5.0}, MagicMock()).empty
+
+
+def test_run_periodic_scans_runs_due_jobs_in_order():
+    """Every job runs on the first wake, then the loop sleeps until the next."""
+    calls = []
+    with patch("continuous_scan.scan") as mock_scan, \
+         patch("continuous_scan.atexit"), \
+         patch("continuous_scan.core.load_kline_history"), \
+         patch("continuous_scan.core.get_tradeable_symbols_sorted_by_volume",
+               return_value=[("BTCUSDT", 1.0)]), \
+         patch("continuous_scan.time.sleep", side_effect=[None, KeyboardInterrupt]) as mock_sleep:
+        for name in ("run_funding_rate_scan", "run_open_interest_scan",
+                     "run_correlation_matrix_scan", "run_volume_scan"):
+            getattr(mock_scan, name).side_effect = (
+                lambda *_, n=name: calls.append(n)
+            )
+        try:
+            continuous_scan.run_periodic_scans()
+        except KeyboardInterrupt:
+            pass
+    assert calls == [
+        "run_funding_rate_scan",
+        "run_open_interest_scan",
+        "run_correlation_matrix_scan",
+        "run_volume_scan",
+    ]
+    assert 59 <= mock_sleep.call_args.args[0] <= 60
+
+
+def test_sort_by_symbol_order_leaves_input_untouched():
+    """Sorting returns a reordered copy without helper columns."""
+    df = pd.DataFrame({"Symbol": ["ETHUSDT", "BTCUSDT"], "5M": [1.0, 2.0]})
+    result = scan.sort_by_symbol_order(df, ["BTCUSDT", "ETHUSDT"], MagicMock(), "x")
+    assert result["Symbol"].tolist() == ["BTCUSDT", "ETHUSDT"]
+    assert list(df.columns) == ["Symbol", "5M"]
+
+
+def test_sort_by_symbol_order_puts_unknown_symbols_last():
+    """Symbols missing from the order keep their relative order at the end."""
+    df = pd.DataFrame({"Symbol": ["XRPUSDT", "ETHUSDT", "DOGEUSDT", "BTCUSDT"]})
+    result = scan.sort_by_symbol_order(df, ["BTCUSDT", "ETHUSDT"], MagicMock(), "x")
+    assert result["Symbol"].tolist() == ["BTCUSDT", "ETHUSDT", "XRPUSDT", "DOGEUSDT"]
+
+
+def test_group_log_by_symbol_buckets_lines(tmp_path):
+    """Lines are grouped by their first bracketed word, others as UNKNOWN."""
+    log = tmp_path / "scanlog.txt"
+    log.write_text("[BTCUSDT] one\nplain line\n[BTCUSDT] two\n", encoding="utf-8")
+    output = group_logs.group_log_by_symbol(str(log))
+    assert output.endswith("scanlog_grouped.txt")
+    with open(output, encoding="utf-8") as f:
+        assert f.read() == (
+            "### BTCUSDT ###\n[BTCUSDT] one\n[BTCUSDT] two\n\n"
+            "### UNKNOWN ###\nplain line\n\n"
+        )
+
+
+def test_closes_correlations_match_single_window():
+    """One pass over the closes gives the same value as each window alone."""
+    rng = np.random.default_rng(0)
+    symbol = rng.uniform(1, 2, 300)
+    btc = rng.uniform(1, 2, 300)
+    windows = [5, 15, 30, 60, 240, 400]
+    fused = correlation_math.closes_correlations(symbol, btc, windows)
+    assert fused == [
+        correlation_math.closes_correlation(symbol, btc, minutes) for minutes in windows
+    ]
+    assert fused[-1] == 0.0
+
+
+def test_cache_put_evicts_least_recent():
+    """Symbol caches keep the most recently stored entries only."""
+    cache = {}
+    put = core._cache_put  # pylint: disable=protected-access
+    put(cache, "A", 1, 2)
+    put(cache, "B", 2, 2)
+    put(cache, "A", 3, 2)
+    put(cache, "C", 4, 2)
+    assert cache == {"A": 3, "C": 4}
+
+
+def test_get_kline_end_time_floors_to_window():
+    """The end time is the start of the current 15 minute window."""
+    with patch("core.time.time", return_value=1717383299.9):
+        assert core.get_kline_end_time() == 1717382700000
+
+
+def test_build_kline_url():
+    """Kline URLs carry the window bounds and the page size."""
+    base = "https://api.bybit.com/v5/market/kline?category=linear&symbol=BTCUSDT&interval=1"
+    assert core.build_kline_url("BTCUSDT", "1", 5) == base + "&start=5&limit=1000"
+    assert core.build_kline_url("BTCUSDT", "1", 5, 9) == base + "&start=5&end=9&limit=1000"
+
+
+def test_scan_passes_share_one_executor():
+    """Every scan pass submits to the same process-wide thread pool."""
+    first, _ = scan.scan_and_collect_results(
+        ["BTCUSDT"], MagicMock(), lambda s, log: {"Symbol": s}
+    )
+    assert first == [{"Symbol": "BTCUSDT"}]
+    assert scan.get_executor() is scan.get_executor()
+    assert scan.get_executor()._max_workers == scan.SCAN_MAX_WORKERS  # pylint: disable=protected-access
+
+
+def test_correlation_rows_match_per_symbol_results():
+    """The batched correlation scan matches process_symbol_correlation."""
+    rng = np.random.default_rng(1)
+
+    def klines(n):
+        closes = rng.uniform(1, 2, n)
+        return [[str(i * 60000), "", "", "", str(c), "1"] for i, c in enumerate(closes)]
+
+    btc = klines(400)
+    cache = {"ETHUSDT": klines(400), "XRPUSDT": klines(100)}
+    closes_rows = [core.symbol_closes(s, MagicMock(), cache) for s in cache]
+    rows = core.correlation_rows(closes_rows, btc)
+    assert rows == [
+        core.process_symbol_correlation(s, btc, MagicMock(), cache) for s in cache
+    ]
+
+
+def test_wait_for_file_close_backs_off():
+    """Retries wait twice as long each time, up to the cap."""
+    attempts = [OSError] * 6
+    def fake_open(*_args, **_kwargs):
+        if attempts:
+            raise attempts.pop()
+        return MagicMock()
+    with patch("builtins.open", side_effect=fake_open), \
+         patch("scan_utils.time.sleep") as mock_sleep:
+        scan_utils.wait_for_file_close("Scan.xlsx", MagicMock())
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays == [0.1, 0.2, 0.4, 0.8, 1.6, scan_utils.MAX_WAIT_DELAY]
+
+
+def test_main_writes_workbooks_concurrently():
+    """The correlation workbook is written on the pool next to Scan.xlsx."""
+    frames = (pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), ["BTCUSDT"])
+    threads = []
+    with patch("scan.setup_logging", return_value=MagicMock()) as mock_logging, \
+         patch("scan.core.get_tradeable_symbols_sorted_by_volume",
+               return_value=[("BTCUSDT", 1.0)]), \
+         patch("scan.clean_existing_excels"), \
+         patch("scan.core.load_kline_history"), \
+         patch("scan.core.save_kline_history"), \
+         patch("scan.prefetch_klines", return_value={}), \
+         patch("scan.run_scan", return_value=frames), \
+         patch("scan.run_correlation_matrix_scan", return_value=pd.DataFrame()), \
+         patch("scan.export_correlation_matrices",
+               side_effect=lambda *_: threads.append(threading.current_thread().name)), \
+         patch("scan.export_all_data") as mock_all:
+        scan.main()
+    assert len(threads) == 1 and threads[0].startswith("scan")
+    mock_all.assert_called_once()
+    # Only the one-shot run batches its log file writes.
+    mock_logging.assert_called_once_with(buffered=True)
+
+
+def test_scan_and_collect_results_bounds_queued_symbols(monkeypatch):
+    """Symbols are submitted in a rolling window, not all at once."""
+    monkeypatch.setattr(scan, "SCAN_MAX_WORKERS", 2)
+    symbols = [f"S{i}" for i in range(10)]
+    with patch("scan.submit_symbol_futures",
+               wraps=scan.submit_symbol_futures) as mock_submit:
+        rows, failed = scan.scan_and_collect_results(
+            symbols, MagicMock(), lambda s, log: {"Symbol": s} if s != "S3" else None
+        )
+    assert max(len(call.args[0]) for call in mock_submit.call_args_list) == 4
+    assert sorted(r["Symbol"] for r in rows) == sorted(set(symbols) - {"S3"})
+    assert failed == ["S3"]
+
+
+def test_export_to_excel_replaces_target_atomically(tmp_path):
+    """The workbook is written beside the target, then moved onto it."""
+    target = tmp_path / "Crypto_Volume.xlsx"
+    target.write_text("old")
+    df = pd.DataFrame([{"Symbol": "BTCUSDT", "5M": 1.0}])
+    scan.export_to_excel(df, ["BTCUSDT"], MagicMock(), filename=str(target))
+    assert target.read_bytes()[:2] == b"PK"
+    assert [p.name for p in tmp_path.iterdir()] == ["Crypto_Volume.xlsx"]
+
+
+def test_replace_file_waits_for_locked_target():
+    """A target held open is waited on before the move is retried."""
+    with patch("scan_utils.os.replace", side_effect=[PermissionError, None]) as mock_replace, \
+         patch("scan_utils.wait_for_file_close") as mock_wait:
+        scan_utils.replace_file("Scan.tmp.xlsx", "Scan.xlsx")
+    mock_wait.assert_called_once_with("Scan.xlsx", None)
+    assert mock_replace.call_count == 2
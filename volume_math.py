@@ -1,31 +1,58 @@
 """Volume math module for calculating percentage volume change across kline blocks."""
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
+# Number of earlier blocks the latest block is compared against.
+LOOKBACK_BLOCKS = 20
 
-def calculate_volume_change(klines: list, block_size: int) -> float:
-    """Calculate % volume change for the latest block vs. previous 20 blocks."""
-    try:
-        sorted_klines = sorted(klines, key=lambda k: int(k[0]))
-
-        blocks = [
-            sorted_klines[i:i + block_size]
-            for i in range(0, len(sorted_klines) - (block_size - 1), block_size)
-            if len(sorted_klines[i:i + block_size]) == block_size
-        ]
-        if len(blocks) < 21:
-            return 0.0
 
-        latest_block = blocks[-1]
-        previous_blocks = blocks[-21:-1]
+def block_sums(volumes: np.ndarray, block_size: int) -> np.ndarray:
+    """Return sums of consecutive ``block_size`` blocks, aligned to the oldest."""
+    block_count = len(volumes) // block_size
+    return volumes[:block_count * block_size].reshape(block_count, block_size).sum(axis=1)
+
 
-        sum_latest = sum(float(k[5]) for k in latest_block)
-        avg_previous = sum(
-            sum(float(k[5]) for k in block) for block in previous_blocks
-        ) / len(previous_blocks)
+def block_changes(sums: np.ndarray) -> np.ndarray:
+    """Return % change of each block vs. the average of the 20 blocks before it.
 
-        if avg_previous == 0:
+    Window sums are reduced directly rather than via a cumsum difference so
+    flat volume yields exact zero changes instead of rounding noise.
+    """
+    if len(sums) <= LOOKBACK_BLOCKS:
+        return np.empty(0)
+    avg_previous = sliding_window_view(sums[:-1], LOOKBACK_BLOCKS).sum(axis=1) / LOOKBACK_BLOCKS
+    latest = sums[LOOKBACK_BLOCKS:]
+    changes = np.divide(
+        latest - avg_previous,
+        avg_previous,
+        out=np.zeros_like(latest),
+        where=avg_previous != 0,
+    )
+    return changes * 100
+
+
+def calculate_volume_change(klines: list, block_size: int) -> float:
+    """Calculate % volume change for the latest block vs. previous 20 blocks."""
+    try:
+        timestamps = np.array([k[0] for k in klines], dtype=np.int64)
+        volumes = np.array([k[5] for k in klines], dtype=np.float64)
+        # Stored history is already oldest-first and raw Bybit pages are
+        # newest-first, so only fall back to a full sort for mixed input.
+        steps = np.diff(timestamps)
+        if (steps < 0).all():
+            volumes = volumes[::-1]
+        elif (steps < 0).any():
+            volumes = volumes[np.argsort(timestamps, kind="stable")]
+
+        block_count = len(volumes) // block_size
+        if block_count <= LOOKBACK_BLOCKS:
             return 0.0
 
-        return ((sum_latest - avg_previous) / avg_previous) * 100
+        # Only the latest 21 blocks matter, so reduce just that tail. Blocks
+        # stay aligned to the oldest kline.
+        end = block_count * block_size
+        tail = volumes[end - (LOOKBACK_BLOCKS + 1) * block_size:end]
+        return float(block_changes(block_sums(tail, block_size))[-1])
     except (ValueError, IndexError, TypeError):
         return 0.0